@@ -1,226 +1,683 @@
 import streamlit as st
-from openai import OpenAI
-import json
-import pandas as pd
-import matplotlib.pyplot as plt
 import os
 import time
 from dotenv import load_dotenv
-import numpy as np
-import re
+import threading
+import random
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from llm_client import ResilientClient, CircuitOpenError
+from question_store import QuestionStore, DEFAULT_POOL_SIZE
+from question_banks import QuestionPool, PooledQuestionBank, LazyQuestionBank, DIFFICULTY_CODES, question_id
+from event_log import EventLog
+from instrumentation import metrics, span, observe, bind_sink, summarize, start_metrics_server
+from question_dedup import NearDuplicateIndex, DEFAULT_THRESHOLD
+from question_source import load_question_index
+from session_engine import TestSession, update_difficulty
+from prompts import easy_prompts, medium_prompts, hard_prompts, STRUCTURED_INSTRUCTION, BATCH_INSTRUCTION
+from scoring import calculate_adaptive_score, calculate_difficulty_stats, assess_skill
+from question_parser import parse_structured_question, parse_question_batch, response_format, parse_stats, QuestionParseError, StreamingQuestionParser
 
 # Load environment variables from .env file
 load_dotenv()
 
 # Initialize Hugging Face Inference Client with API token
 GEM_API = os.getenv("GEM_API")  # Load token from environment variable
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/openai/")
 
-client = OpenAI(api_key= GEM_API,base_url="https://generativelanguage.googleapis.com/v1beta/openai/")
-
-# Define unique prompt templates for each difficulty level
-
-easy_prompts = [
-    "Generate an easy GMAT-style quantitative question that involves subtracting two large numbers (e.g., a six-digit number minus a two-digit number). Include five answer choices labeled A–E.",
-    "Create an easy quantitative problem where the question asks for the sum of a sequence of consecutive integers (for example, summing all numbers from 51 to 100). Provide five multiple-choice options.",
-    "Write a GMAT-style question on percent calculations where the problem involves finding the percent increase or decrease of a single value.",
-    "Design an easy quantitative question that asks for the average of a small set of numbers. Ensure the question has five multiple-choice options in a GMAT style.",
-    "Generate a straightforward GMAT quantitative problem involving a basic ratio or proportion between two numbers. Include five answer choices labeled A–E.",
-    "Create an easy question that requires calculating speed, distance, or time with simple numerical values. Format the answer as five multiple-choice options.",
-    "Write an easy GMAT quantitative problem on a work-rate scenario involving a single worker completing a task. Provide five multiple-choice answer options.",
-    "Design an easy quantitative question that asks for the calculation of simple interest given principal, rate, and time. Include five answer choices labeled A–E.",
-    "Generate a basic GMAT-style problem where the candidate solves a single-step linear equation. Format the question with five multiple-choice options.",
-    "Create an easy probability question (e.g., finding the probability of a simple event with equally likely outcomes). Present five answer options in GMAT format."
-]
-
-medium_prompts = [
-    "Generate a medium-difficulty GMAT quantitative problem that involves properties of factorials and divisibility by certain factors. Provide five multiple-choice answer options.",
-    "Design a medium-level question requiring a two-step percent change calculation (e.g., an item’s price increases then decreases). Include five answer choices labeled A–E.",
-    "Write a GMAT-style quantitative problem on profit and loss where two transactions or conditions must be considered. Provide five multiple-choice options.",
-    "Create a medium-difficulty problem that involves mixing two solutions or ingredients and determining the final concentration. Include five answer choices.",
-    "Develop a medium-level GMAT question on sequences defined by a simple recurrence relation (for example, each term is a linear function of the previous term). Format with five answer options.",
-    "Write a quantitative question in the GMAT style where two or three workers with different rates complete a job. Include five multiple-choice answer options.",
-    "Generate a medium-difficulty problem on ratio and proportion that involves combining two or more ratios to find an unknown quantity. Present five answer choices.",
-    "Create a medium-level GMAT Data Sufficiency question that asks whether a given algebraic statement is sufficient to determine an unknown value. Provide two statements and five answer options.",
-    "Develop a GMAT-style probability problem that requires using combinations to determine the probability of a specific event. Format the question with five answer choices.",
-    "Design a medium-difficulty quantitative problem that combines percentage calculations with an average (arithmetic mean) computation. Provide five answer choices."
-]
-
-hard_prompts = [
-    "Generate a challenging GMAT-style quantitative question involving factorials and the determination of the highest power of a prime factor in n!. Include five multiple-choice answer options.",
-    "Create a hard GMAT question that requires multi-step reasoning in a profit and loss scenario with varying markups and discounts. Provide five answer choices.",
-    "Design a difficult quantitative problem where a mixture’s concentration changes over time due to evaporation. The question should include several calculation steps and five answer choices.",
-    "Write a hard GMAT-style question on sequences where the recurrence relation is non-linear or requires additional insight to find a specific term. Format the question with five answer options.",
-    "Generate a challenging GMAT quantitative problem involving work and time where multiple workers with different efficiencies complete overlapping tasks. Include five answer choices labeled A–E.",
-    "Develop a hard GMAT Data Sufficiency question that involves two or more interrelated algebraic expressions. Provide two statements and five answer options.",
-    "Create a challenging GMAT probability problem that requires calculating conditional probabilities for multiple interdependent events. Format the question with five answer options.",
-    "Design a hard GMAT-style question in coordinate geometry that involves solving a system of equations to determine a geometric property (e.g., the distance between two points). Include five answer choices.",
-    "Generate a challenging quantitative problem where the candidate must work with functions and their inverses, including composite function operations. Present five answer choices.",
-    "Write a hard GMAT quantitative question that involves complex ratios and proportions with fractional relationships, requiring multiple steps to solve. Provide five answer choices labeled A–E."
-]
-
-# Updated function to generate a question using a custom prompt
-def generate_question(custom_prompt, max_attempts=3):
-    # Append explicit structured instructions and an example to the custom prompt
-    structured_instruction = (
-        "\n\nIMPORTANT: Your entire output MUST be a valid JSON object with exactly these keys: "
-        "'question', 'choices', and 'correct_answer'. No additional text should be output. "
-        "The 'choices' value must be an array of 5 strings, each starting with 'A.', 'B.', 'C.', 'D.', and 'E.' respectively. "
-        "Example: {\"question\": \"What is 2+2?\", \"choices\": [\"A. 3\", \"B. 4\", \"C. 5\", \"D. 6\", \"E. 7\"], \"correct_answer\": \"B\"}"
+# Rate limiting, retry and circuit-breaker settings for the shared client.
+# LLM_RATE (requests per second) is off by default: a fixed client-side rate
+# would throttle GEN_WORKERS concurrent generations below what the endpoint
+# allows, and its 429s are already retried with backoff that honours
+# Retry-After. Set it to stay under a known quota.
+LLM_RATE = float(os.getenv("LLM_RATE", "0"))
+LLM_BURST = int(os.getenv("LLM_BURST", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+# One client per server process, shared by every session and worker thread
+@st.cache_resource
+def get_llm_client():
+    client = ResilientClient(
+        GEM_API, LLM_BASE_URL,
+        rate=LLM_RATE, burst=LLM_BURST, max_retries=LLM_MAX_RETRIES,
+        breaker_threshold=LLM_BREAKER_THRESHOLD, breaker_cooldown=LLM_BREAKER_COOLDOWN
     )
-    attempts = 0
-    while attempts < max_attempts:
-        try:
-            response = client.chat.completions.create(
-                model="gemini-2.5-flash",
-                messages=[{"role": "system","content": structured_instruction},
-                          {"role": "user","content": custom_prompt}
-                         ]
+    metrics.register_collector("llm", client.stats)
+    return client
+
+MODEL_NAME = os.getenv("LLM_MODEL", "gemini-2.5-flash")
+
+# Constrain completions with response_format: "json_schema", "json_object" or "off"
+STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "json_schema")
+
+# Number of LLM calls allowed in flight at once while building the question bank
+GEN_WORKERS = int(os.getenv("GEN_WORKERS", "8"))
+
+# Prompts sent per completion while building the bank (1 = one question per call)
+GEN_BATCH_SIZE = int(os.getenv("GEN_BATCH_SIZE", "1"))
+
+# On-disk question cache shared by every session of this server
+QUESTION_CACHE_PATH = os.getenv("QUESTION_CACHE_PATH", "question_cache.db")
+QUESTION_POOL_SIZE = int(os.getenv("QUESTION_POOL_SIZE", str(DEFAULT_POOL_SIZE)))
+QUESTION_CACHE_TTL = float(os.getenv("QUESTION_CACHE_TTL", "0")) or None
+
+# Near-duplicate filter for generated questions: "embedding" (needs
+# sentence-transformers and chromadb; falls back to minhash without them),
+# "minhash" (lexical, CPU-only) or "off". DEDUP_THRESHOLD overrides the mode's
+# similarity threshold.
+DEDUP_MODE = os.getenv("DEDUP_MODE", "embedding")
+DEDUP_THRESHOLD = os.getenv("DEDUP_THRESHOLD")
+DEDUP_INDEX_PATH = os.getenv("DEDUP_INDEX_PATH", "question_index")
+DEDUP_MODEL = os.getenv("DEDUP_MODEL", "all-MiniLM-L6-v2")
+
+# Append-only log of every submitted answer, the input for calibrate.py
+# (set EVENT_LOG_PATH to an empty string to disable)
+EVENT_LOG_PATH = os.getenv("EVENT_LOG_PATH", "events.db")
+
+# Stream on-demand generations so the question stem shows up while the rest of
+# the completion is still arriving (set to 0 for endpoints that cannot stream)
+STREAM_GENERATION = os.getenv("STREAM_GENERATION", "1") == "1"
+
+# Stage timings: Prometheus text on METRICS_PORT (/metrics), finished spans as
+# JSON lines in SPAN_LOG_PATH, and DEBUG_TIMINGS=1 for an in-app panel listing
+# the current session's slowest stages
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+SPAN_LOG_PATH = os.getenv("SPAN_LOG_PATH", "")
+DEBUG_TIMINGS = os.getenv("DEBUG_TIMINGS", "0") == "1"
+
+# Calibrated IRT item parameters (see calibrate.py); uncalibrated items use defaults
+ITEM_PARAMS_PATH = os.getenv("ITEM_PARAMS_PATH", "item_params.csv")
+
+ENGINE_RULE_BASED = "Rule-based"
+ENGINE_IRT = "Item response theory"
+
+# Curated questions served without any model calls
+OFFLINE_BANK_PATH = os.getenv(
+    "OFFLINE_BANK_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "trials", "gmat_question_bank.json")
 )
-            try:
-                question_data = json.loads(response)
-            except json.JSONDecodeError:
-                json_match = re.search(r'\{(?:[^{}]|(?:\{[^{}]*\}))*\}', response, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(0)
-                    json_str = re.sub(r',\s*}', '}', json_str)
-                    try:
-                        question_data = json.loads(json_str)
-                    except json.JSONDecodeError:
-                        question_data = None
-                else:
-                    question_data = None
 
-            if question_data is not None and all(k in question_data for k in ['question', 'choices', 'correct_answer']):
-                if len(question_data['choices']) < 5:
-                    question_data['choices'] += [f"{chr(65+i)}. Option {i+1}" for i in range(len(question_data['choices']), 5)]
-                if question_data['correct_answer'] and question_data['correct_answer'][0] in ['A', 'B', 'C', 'D', 'E']:
-                    question_data['correct_answer'] = question_data['correct_answer'][0]
-                else:
-                    question_data['correct_answer'] = 'A'
-                return question_data
-        except Exception as e:
-            st.error(f"Error generating question: {str(e)}")
-        attempts += 1
-        time.sleep(1)
+# Shared near-duplicate index, backfilled with whatever the question cache
+# already holds (embeddings are computed only once, then persisted)
+@st.cache_resource(show_spinner=False)
+def get_dedup_index():
+    if DEDUP_MODE == "off":
+        return None
+    threshold = float(DEDUP_THRESHOLD) if DEDUP_THRESHOLD else None
+    index = None
+    if DEDUP_MODE == "embedding":
+        index = NearDuplicateIndex(DEDUP_INDEX_PATH, model_name=DEDUP_MODEL, threshold=threshold or DEFAULT_THRESHOLD)
+        if not index.load():
+            index = None
+    if index is None:
+        from minhash import MinHashIndex, DEFAULT_THRESHOLD as MINHASH_THRESHOLD
 
-    st.warning("Unable to generate valid question format after multiple attempts. Using placeholder.")
+        index = MinHashIndex(threshold or MINHASH_THRESHOLD)
+    index.add(get_question_store().texts())
+    return index
+
+# Exporters are process-wide and started by the first session
+@st.cache_resource
+def start_metrics_exporters():
+    metrics.register_collector("parse", parse_stats.snapshot)
+    if SPAN_LOG_PATH:
+        metrics.export_spans_to(SPAN_LOG_PATH)
+    return start_metrics_server(METRICS_PORT) if METRICS_PORT else None
+
+# This session's most recent spans, for the debug panel
+def session_timings():
+    if "stage_timings" not in st.session_state:
+        st.session_state.stage_timings = deque(maxlen=1000)
+    return st.session_state.stage_timings
+
+# One buffered writer per server process; sessions only enqueue events
+@st.cache_resource
+def get_event_log():
+    return EventLog(EVENT_LOG_PATH) if EVENT_LOG_PATH else None
+
+PROMPT_DIFFICULTY = {
+    prompt: difficulty
+    for difficulty, prompts in [("easy", easy_prompts), ("medium", medium_prompts), ("hard", hard_prompts)]
+    for prompt in prompts
+}
+
+GENERATION_PLACEHOLDER = "Sample question (placeholder due to invalid format generation)"
+
+@st.cache_resource
+def get_question_store():
+    return QuestionStore(QUESTION_CACHE_PATH, pool_size=QUESTION_POOL_SIZE, max_age=QUESTION_CACHE_TTL)
+
+# Generated questions shared by every session of this server. The pool starts
+# empty and is filled by the first session that asks for a full bank.
+@st.cache_resource
+def get_question_pool():
+    return QuestionPool()
+
+@st.cache_resource
+def get_question_index():
+    return load_question_index(OFFLINE_BANK_PATH)
+
+# Chat completion with the requested response_format; if the endpoint rejects
+# the format the request is repeated as prompt-only JSON, and once that works
+# the process stops asking for structured output
+def create_completion(messages, request_format, **options):
+    from openai import BadRequestError
+
+    client = get_llm_client()
+    if request_format and not client.response_format_rejected:
+        try:
+            return client.chat_completion(model=MODEL_NAME, messages=messages, response_format=request_format, **options)
+        except BadRequestError:
+            parse_stats.record("format_rejected")
+            response = client.chat_completion(model=MODEL_NAME, messages=messages, **options)
+            client.response_format_rejected = True
+            return response
+    return client.chat_completion(model=MODEL_NAME, messages=messages, **options)
+
+def completion_text(response):
+    return response.choices[0].message.content if response.choices else None
+
+# Streamed completion text. The question parsed so far is published to
+# `progress` as chunks arrive, and the time to the first token is recorded.
+def stream_completion_text(messages, request_format, progress):
+    parser = StreamingQuestionParser()
+    started = time.perf_counter()
+    first_token = True
+    with create_completion(messages, request_format, stream=True) as stream:
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            if first_token:
+                observe("llm_first_token", time.perf_counter() - started)
+                first_token = False
+            if parser.feed(delta):
+                progress.update(parser.snapshot())
+    return parser.text
+
+def generation_placeholder():
     return {
-        "question": "Sample question (placeholder due to invalid format generation)",
+        "question": GENERATION_PLACEHOLDER,
         "choices": ["A. Option 1", "B. Option 2", "C. Option 3", "D. Option 4", "E. Option 5"],
-        "correct_answer": "A"
+        "correct_answer": "A",
+        "placeholder": True
     }
 
-# Function to generate question bank with 10 questions per difficulty using unique prompts
-def generate_question_bank():
-    st.write("Generating questions for your test...")
-    progress_bar = st.progress(0)
-    question_bank = {"easy": [], "medium": [], "hard": []}
-    prompt_dict = {
-        "easy": easy_prompts,
-        "medium": medium_prompts,
-        "hard": hard_prompts
+# Updated function to generate a question using a custom prompt. With a
+# `progress` (GenerationProgress) the completion is streamed into it. Raises
+# CircuitOpenError once the circuit breaker opens, so the caller can fail over.
+def generate_question(custom_prompt, max_attempts=3, progress=None):
+    messages = [{"role": "system", "content": STRUCTURED_INSTRUCTION},
+                {"role": "user", "content": custom_prompt}]
+    request_format = response_format(STRUCTURED_OUTPUT)
+    attempts = 0
+    with span("generate_question", difficulty=PROMPT_DIFFICULTY.get(custom_prompt)) as record:
+        while attempts < max_attempts:
+            attempts += 1
+            record["attributes"]["attempts"] = attempts
+            try:
+                with span("llm_request", streamed=progress is not None):
+                    if progress is not None:
+                        text = stream_completion_text(messages, request_format, progress)
+                    else:
+                        text = completion_text(create_completion(messages, request_format))
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                # The client has already retried transient errors with backoff;
+                # ask again without streaming in case that is what failed
+                st.error(f"Error generating question: {str(e)}")
+                progress = None
+                continue
+            try:
+                with span("parse_validate"):
+                    return parse_structured_question(text)
+            except QuestionParseError:
+                # A badly formatted completion is not a transient failure, so ask again right away
+                continue
+        record["attributes"]["placeholder"] = True
+
+    st.warning("Unable to generate valid question format after multiple attempts. Using placeholder.")
+    return generation_placeholder()
+
+# Generate one question per prompt in a single completion. Items that come back
+# missing or invalid are re-requested together, so a bad item never costs a full
+# re-run of the batch. Items still pending when the circuit breaker opens come
+# back as None, so the caller can fail over without losing the others.
+def generate_questions_batch(prompts, max_attempts=3):
+    questions = [None] * len(prompts)
+    pending = list(range(len(prompts)))
+    request_format = response_format(STRUCTURED_OUTPUT, batch=True)
+    attempts = 0
+    circuit_open = False
+    with span("generate_questions_batch", size=len(prompts)) as record:
+        while pending and attempts < max_attempts:
+            attempts += 1
+            record["attributes"]["attempts"] = attempts
+            requests = "\n".join(f"{n}. {prompts[i]}" for n, i in enumerate(pending, 1))
+            messages = [{"role": "system", "content": BATCH_INSTRUCTION.format(count=len(pending))},
+                        {"role": "user", "content": requests}]
+            try:
+                with span("llm_request", batch=len(pending)):
+                    response = create_completion(messages, request_format)
+            except CircuitOpenError:
+                circuit_open = True
+                break
+            except Exception as e:
+                st.error(f"Error generating questions: {str(e)}")
+                continue
+            try:
+                with span("parse_validate", batch=len(pending)):
+                    parsed = parse_question_batch(completion_text(response), len(pending))
+            except QuestionParseError:
+                continue
+            for i, question in zip(pending, parsed):
+                questions[i] = question
+            pending = [i for i in pending if questions[i] is None]
+
+    if pending and not circuit_open:
+        st.warning(f"Unable to generate {len(pending)} of {len(prompts)} questions in a valid format. Using placeholders.")
+        for i in pending:
+            questions[i] = generation_placeholder()
+    return questions
+
+# True when a freshly generated question paraphrases one already generated or
+# cached; questions that pass are added to the index
+def is_near_duplicate(question):
+    if question['question'] == GENERATION_PLACEHOLDER:
+        return False
+    index = get_dedup_index()
+    return index is not None and not index.admit(question['question'])
+
+def remember_question(store, custom_prompt, question):
+    if question['question'] != GENERATION_PLACEHOLDER:
+        store.add(custom_prompt, MODEL_NAME, question)
+
+# While the circuit breaker is open, serve any cached question for the prompt,
+# then a curated question of the same difficulty, instead of calling the model.
+# Also used when the breaker opens mid-generation.
+def failover_question(store, custom_prompt, exclude=()):
+    cached = store.sample(custom_prompt, MODEL_NAME, exclude)
+    if cached is not None:
+        return cached
+    difficulty = PROMPT_DIFFICULTY.get(custom_prompt)
+    if difficulty is None:
+        return None
+    # A few random positions rather than every question at this difficulty
+    index = get_question_index()
+    count = index.count(difficulty)
+    for position in random.sample(range(count), min(count, 8)):
+        question = index.get(difficulty, position)
+        if question['question'] not in exclude:
+            return question
+    return None
+
+# Serve a cached question for the prompt once its pool is full; otherwise call the
+# model and keep the result so later sessions can reuse it
+def fetch_question(store, custom_prompt, exclude=(), progress=None):
+    if get_llm_client().circuit_open:
+        question = failover_question(store, custom_prompt, exclude)
+        if question is not None:
+            return question
+    if store.is_full(custom_prompt, MODEL_NAME):
+        cached = store.sample(custom_prompt, MODEL_NAME, exclude)
+        if cached is not None:
+            return cached
+    try:
+        question = generate_question(custom_prompt, progress=progress)
+        retry_count = 0
+        while is_near_duplicate(question):
+            if retry_count >= 3:
+                question = failover_question(store, custom_prompt, exclude) or generation_placeholder()
+                break
+            question = generate_question(custom_prompt, progress=progress)
+            retry_count += 1
+    except CircuitOpenError:
+        return failover_question(store, custom_prompt, exclude) or generation_placeholder()
+    remember_question(store, custom_prompt, question)
+    return question
+
+# Batched fetch_question: prompts without a full cache pool share one completion
+def fetch_question_batch(store, prompts, excludes):
+    questions = [None] * len(prompts)
+    circuit_open = get_llm_client().circuit_open
+    for i, custom_prompt in enumerate(prompts):
+        if circuit_open:
+            questions[i] = failover_question(store, custom_prompt, excludes[i])
+        elif store.is_full(custom_prompt, MODEL_NAME):
+            questions[i] = store.sample(custom_prompt, MODEL_NAME, excludes[i])
+    missing = [i for i, question in enumerate(questions) if question is None]
+    failed_over = []
+    # Near duplicates are re-requested together, like invalid items
+    for _ in range(4):
+        if not missing:
+            break
+        generated = generate_questions_batch([prompts[i] for i in missing])
+        rejected = []
+        for i, question in zip(missing, generated):
+            if question is None:
+                # The circuit breaker opened before this item was generated
+                failed_over.append(i)
+            elif is_near_duplicate(question):
+                rejected.append(i)
+            else:
+                questions[i] = question
+                remember_question(store, prompts[i], question)
+        missing = rejected
+    for i in failed_over + missing:
+        questions[i] = failover_question(store, prompts[i], excludes[i]) or generation_placeholder()
+    return questions
+
+def placeholder_question(difficulty, number):
+    return {
+        "question": f"Unique sample {difficulty} question {number}",
+        "choices": [f"A. Option 1", f"B. Option 2", f"C. Option 3", f"D. Option 4", f"E. Option 5"],
+        "correct_answer": "A",
+        "placeholder": True
     }
+
+# Original one-call-at-a-time builder, kept for GEN_WORKERS=1 and debugging
+def generate_question_bank_serial(store, prompt_dict, progress_bar):
+    question_bank = {"easy": [], "medium": [], "hard": []}
+    total = sum(min(10, len(prompt_dict[d])) for d in question_bank)
     for difficulty in question_bank.keys():
         prompts = prompt_dict[difficulty]
         count = 0
         while count < 10 and count < len(prompts):
             custom_prompt = prompts[count]
-            question = generate_question(custom_prompt)
+            seen = {q['question'] for q in question_bank[difficulty]}
+            question = fetch_question(store, custom_prompt, seen)
             retry_count = 0
-            while any(q['question'] == question['question'] for q in question_bank[difficulty]) and retry_count < 3:
-                time.sleep(1)
-                question = generate_question(custom_prompt)
+            while question['question'] in seen and retry_count < 3:
+                question = fetch_question(store, custom_prompt, seen)
                 retry_count += 1
-            if any(q['question'] == question['question'] for q in question_bank[difficulty]):
-                question = {
-                    "question": f"Unique sample {difficulty} question {count+1}",
-                    "choices": [f"A. Option 1", f"B. Option 2", f"C. Option 3", f"D. Option 4", f"E. Option 5"],
-                    "correct_answer": "A"
-                }
+            if question['question'] in seen:
+                question = placeholder_question(difficulty, count + 1)
             question_bank[difficulty].append(question)
             count += 1
-            overall_progress = (len(question_bank["easy"]) + len(question_bank["medium"]) + len(question_bank["hard"])) / 30
+            overall_progress = (len(question_bank["easy"]) + len(question_bank["medium"]) + len(question_bank["hard"])) / total
             progress_bar.progress(overall_progress)
+    return question_bank
+
+# Fan every prompt out over a bounded thread pool, `batch_size` prompts per
+# completion. Results are deduplicated per difficulty as they arrive; a duplicate
+# re-submits its own prompt (up to 3 times) instead of blocking the other slots,
+# then falls back to a placeholder.
+def generate_question_bank_concurrent(store, prompt_dict, progress_bar, max_workers=GEN_WORKERS, batch_size=GEN_BATCH_SIZE):
+    question_bank = {d: [None] * min(10, len(prompt_dict[d])) for d in ["easy", "medium", "hard"]}
+    texts = {d: set() for d in question_bank}
+    total = sum(len(slots) for slots in question_bank.values())
+    filled = 0
+    # Worker threads need the script context so st.error/st.warning still render
+    ctx = get_script_run_ctx()
+    timings = session_timings()
+
+    def attach_context():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        bind_sink(timings)
+
+    with ThreadPoolExecutor(max_workers=max_workers, initializer=attach_context) as executor:
+        def submit(slots):
+            prompts = [prompt_dict[difficulty][index] for difficulty, index in slots]
+            seen = [frozenset(texts[difficulty]) for difficulty, _ in slots]
+            if len(slots) == 1:
+                return executor.submit(lambda: [fetch_question(store, prompts[0], seen[0])])
+            return executor.submit(fetch_question_batch, store, prompts, seen)
+
+        all_slots = [(difficulty, index) for difficulty, slots in question_bank.items() for index in range(len(slots))]
+        step = max(batch_size, 1)
+        futures = {}
+        for start in range(0, len(all_slots), step):
+            futures[submit(all_slots[start:start + step])] = (all_slots[start:start + step], 0)
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                slots, retry_count = futures.pop(future)
+                for (difficulty, index), question in zip(slots, future.result()):
+                    if question['question'] in texts[difficulty]:
+                        if retry_count < 3:
+                            futures[submit([(difficulty, index)])] = ([(difficulty, index)], retry_count + 1)
+                            continue
+                        question = placeholder_question(difficulty, index + 1)
+                    question_bank[difficulty][index] = question
+                    texts[difficulty].add(question['question'])
+                    filled += 1
+                progress_bar.progress(filled / total)
+    return question_bank
+
+# Function to generate question bank with 10 questions per difficulty using unique prompts
+def generate_question_bank(max_workers=GEN_WORKERS):
+    st.write("Generating questions for your test...")
+    progress_bar = st.progress(0)
+    prompt_dict = {
+        "easy": easy_prompts,
+        "medium": medium_prompts,
+        "hard": hard_prompts
+    }
+    store = get_question_store()
+    with span("generate_question_bank", workers=max_workers):
+        if max_workers > 1:
+            question_bank = generate_question_bank_concurrent(store, prompt_dict, progress_bar, max_workers)
+        else:
+            question_bank = generate_question_bank_serial(store, prompt_dict, progress_bar)
     progress_bar.progress(1.0)
     st.success("Question bank successfully generated!")
+    stats = parse_stats.snapshot()
+    client_stats = get_llm_client().stats()
+    if stats or client_stats:
+        st.caption(
+            f"Structured responses: {stats.get('structured', 0)}, "
+            f"text-parse fallbacks: {stats.get('text_fallback', 0)} ({parse_stats.fallback_rate():.0%}), "
+            f"unparseable: {stats.get('failed', 0)}, "
+            f"throttled: {client_stats.get('throttled', 0)}, "
+            f"retries: {client_stats.get('retries', 0)}"
+        )
     return question_bank
 
-# Updated update_difficulty function based on the new rules:
-def update_difficulty(was_correct, current_difficulty, streak):
-    # New adaptive rules:
-    # - If correct:
-    #     - easy  → medium
-    #     - medium → hard
-    #     - hard   → hard (remains unchanged)
-    # - If wrong:
-    #     - easy   → easy (remains unchanged)
-    #     - medium → easy
-    #     - hard   → medium
-    if was_correct:
-        if current_difficulty == "easy":
-            new_difficulty = "medium"
-        elif current_difficulty == "medium":
-            new_difficulty = "hard"
-        else:  # current_difficulty == "hard"
-            new_difficulty = "hard"
-    else:
-        if current_difficulty == "easy":
-            new_difficulty = "easy"
-        elif current_difficulty == "medium":
-            new_difficulty = "easy"
-        else:  # current_difficulty == "hard"
-            new_difficulty = "medium"
-    
-    new_streak = 0
-    return new_difficulty, new_streak
-
-def calculate_adaptive_score(difficulty_history, answers):
-    difficulty_points = {'easy': 1, 'medium': 2, 'hard': 3}
-    raw_score = sum(difficulty_points[diff] for i, diff in enumerate(difficulty_history) if answers[i])
-    max_score = sum(difficulty_points[diff] for diff in difficulty_history)
-    percentage = (raw_score / max_score) * 100 if max_score > 0 else 0
-    weighted_score = 0
-    total_weight = 0
-    for i, diff in enumerate(difficulty_history):
-        weight = (i + 1) / len(difficulty_history)
-        total_weight += weight
-        if answers[i]:
-            weighted_score += difficulty_points[diff] * weight
-    normalized_weighted_score = (weighted_score / total_weight) * len(difficulty_history) if total_weight > 0 else 0
+# On-demand bank: the first question costs one model call and the candidates for
+# the next answer are prefetched in the background
+def create_lazy_question_bank():
+    store = get_question_store()
+    # Prefetch threads need the script context so st.error/st.warning still render
+    ctx = get_script_run_ctx()
+    timings = session_timings()
+
+    def attach_context():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        bind_sink(timings)
+
+    def fetch(prompt, exclude, progress=None):
+        return fetch_question(store, prompt, exclude, progress)
+
+    return LazyQuestionBank(
+        fetch,
+        {"easy": easy_prompts, "medium": medium_prompts, "hard": hard_prompts},
+        update_difficulty,
+        placeholder_question,
+        streaming=STREAM_GENERATION,
+        thread_initializer=attach_context
+    )
+
+# Curated bank shared by all sessions; the model is only called once a
+# difficulty's curated questions are used up
+def create_offline_question_bank():
+    return PooledQuestionBank(get_question_index(), fallback_factory=create_lazy_question_bank)
+
+# Cursor into the process-wide generated pool, building the pool on first use.
+# Placeholders stay out of the pool, so after an incomplete build this session
+# generates whatever its difficulty is missing on demand.
+def create_pooled_question_bank():
+    pool = get_question_pool()
+    pool.ensure_built(generate_question_bank)
+    return PooledQuestionBank(pool, fallback_factory=None if pool.ready else create_lazy_question_bank)
+
+# IRT item table for a shared pool, with the pool's questions in item order.
+# Keyed on the pool's identity and size so a pool that has grown gets a new table.
+@st.cache_resource(max_entries=4, show_spinner=False)
+def get_item_bank(_pool, pool_id, pool_size):
+    from irt_engine import load_item_parameters
+
+    questions = _pool.questions()
+    return _pool.item_bank(load_item_parameters(ITEM_PARAMS_PATH)), questions
+
+def start_irt_session(pool, initial_difficulty):
+    from irt_engine import IRTSession, DEFAULT_ITEM_PARAMS
+
+    item_bank, questions = get_item_bank(pool, id(pool), pool.size())
+    return IRTSession(item_bank, start_theta=DEFAULT_ITEM_PARAMS[initial_difficulty][1]), questions
+
+# on_progress callback for TestSession.start/advance: renders a question that is still
+# being generated, the stem as it streams in and each choice once complete
+def question_preview(container):
+    def render(partial):
+        lines = [f"**{partial['question']}**"] if partial["question"] else []
+        lines += [f"- {choice}" for choice in partial["choices"]]
+        container.markdown("\n".join(lines))
+    return render
+
+# Slowest stages of this session so far
+def render_timings_panel():
+    rows = summarize(list(session_timings()))
+    with st.sidebar.expander("Stage timings", expanded=True):
+        if not rows:
+            st.caption("Nothing timed yet.")
+            return
+        lines = ["| Stage | Count | Total s | Max s |", "|---|---:|---:|---:|"]
+        lines += [f"| {name} | {count} | {total:.3f} | {longest:.3f} |" for name, count, total, longest in rows[:12]]
+        st.markdown("\n".join(lines))
+
+# Difficulty progression chart as a plotly figure, rendered in the browser
+def build_progression_figure(difficulty_history, answers):
+    import plotly.graph_objects as go
+
+    question_numbers = list(range(1, len(difficulty_history) + 1))
+    difficulty_numeric = [{"easy": 1, "medium": 2, "hard": 3}[d] for d in difficulty_history]
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=question_numbers, y=difficulty_numeric, mode="lines+markers",
+        line=dict(color="blue", width=2), showlegend=False, hoverinfo="skip"
+    ))
+    for correct, color, label in [(True, "green", "Correct Answer"), (False, "red", "Incorrect Answer")]:
+        points = [i for i, ans in enumerate(answers) if bool(ans) == correct]
+        fig.add_trace(go.Scatter(
+            x=[question_numbers[i] for i in points], y=[difficulty_numeric[i] for i in points],
+            mode="markers", marker=dict(color=color, size=12), name=label
+        ))
+    fig.update_layout(
+        title="Difficulty Progression Throughout the Test",
+        xaxis=dict(title="Question Number", tickmode="array", tickvals=question_numbers, gridcolor="lightgray", griddash="dash"),
+        yaxis=dict(title="Difficulty Level", tickmode="array", tickvals=[1, 2, 3], ticktext=["Easy", "Medium", "Hard"],
+                   range=[0.5, 3.5], gridcolor="lightgray", griddash="dash"),
+        plot_bgcolor="white", height=400, margin=dict(l=40, r=20, t=60, b=40)
+    )
+    return fig
+
+# Scores, per-difficulty stats and assessment for the results page, computed
+# once per finished test and shared by every rerun (and every session) with the
+# same history and answers. Plain data only: cache_data hands each caller its
+# own copy, so nothing a render does can leak into another session.
+@st.cache_data(max_entries=512, ttl=3600, show_spinner=False)
+def build_results_view(difficulty_history, answers):
+    score_data = calculate_adaptive_score(difficulty_history, answers)
+    difficulty_stats = calculate_difficulty_stats(difficulty_history, answers)
     return {
-        'raw_score': raw_score,
-        'max_score': max_score,
-        'percentage': percentage,
-        'weighted_score': round(normalized_weighted_score, 1)
+        "score_data": score_data,
+        "difficulty_stats": difficulty_stats,
+        "assessment": assess_skill(score_data, difficulty_stats),
     }
 
+# Per-question table for the results page, styled with the result colours.
+# Built on every render: a Styler is mutable and Streamlit renders it.
+def build_results_table(difficulty_history, answers):
+    import pandas as pd
+
+    summary_df = pd.DataFrame({
+        "Question": [f"Q{i+1}" for i in range(len(difficulty_history))],
+        "Difficulty": list(difficulty_history),
+        "Result": ["✓" if ans else "✗" for ans in answers],
+        "Points": [{"easy": 1, "medium": 2, "hard": 3}[diff] if ans else 0
+                   for diff, ans in zip(difficulty_history, answers)]
+    })
+    def highlight_result(val):
+        color = 'lightgreen' if val == "✓" else 'lightcoral' if val == "✗" else ''
+        return f'background-color: {color}'
+    # Styler.map is pandas >= 2.1; older releases only have applymap
+    style = summary_df.style
+    style_cells = getattr(style, "map", None) or style.applymap
+    return style_cells(highlight_result, subset=['Result'])
+
+# Submit Answer callback. It records the answer and lets the session pick where
+# the test goes next; the script run Streamlit starts right after it shows the
+# feedback and draws the next question, so the script thread never sleeps.
+def submit_answer():
+    test = st.session_state.test
+    current_q = test.question
+    previous_difficulty = test.difficulty
+    with span("submit_answer"):
+        correct_answer = current_q["correct_answer"]
+        was_correct = st.session_state[f"q{test.number}"].startswith(correct_answer)
+        event_log = get_event_log()
+        if event_log is not None:
+            event_log.record(
+                st.session_state.attempt_id,
+                current_q.get("id") or question_id(current_q["question"]),
+                DIFFICULTY_CODES[previous_difficulty],
+                was_correct,
+                latency_ms=(time.monotonic() - st.session_state.shown_at) * 1000
+            )
+        new_difficulty = test.submit(was_correct)
+    if was_correct:
+        feedback = [("success", f"Correct! The answer is {correct_answer}.")]
+    else:
+        feedback = [("error", f"Incorrect. The correct answer is {correct_answer}.")]
+    if new_difficulty is None:
+        # Nothing left to prefetch for this test; a new test restarts the workers
+        st.session_state.question_bank.shutdown()
+        if test.answered < test.length:
+            feedback.append(("error", "No more questions available in the bank. Test will end now."))
+        else:
+            feedback.append(("write", "Test complete! View your results below."))
+    elif new_difficulty != previous_difficulty:
+        if new_difficulty == "hard":
+            feedback.append(("success", "Great job! The next question will be harder."))
+        elif new_difficulty == "easy":
+            feedback.append(("info", "The next question will be easier."))
+        else:
+            feedback.append(("info", f"Adjusting difficulty to {new_difficulty}."))
+    st.session_state.feedback = feedback
+
 def main():
     st.title("Adaptive GMAT Quantitative Test")
+    start_metrics_exporters()
+    bind_sink(session_timings())
     if "question_bank" not in st.session_state:
         st.session_state.question_bank = None
         st.session_state.bank_generated = False
-    if "current_question_number" not in st.session_state:
-        st.session_state.current_question_number = 0
-    if "selected_questions" not in st.session_state:
-        st.session_state.selected_questions = []
-    if "answers" not in st.session_state:
-        st.session_state.answers = []
-    if "difficulty_history" not in st.session_state:
-        st.session_state.difficulty_history = []
-    if "difficulty" not in st.session_state:
-        st.session_state.difficulty = "medium"
-    if "difficulty_streak" not in st.session_state:
-        st.session_state.difficulty_streak = 0
-    if "test_started" not in st.session_state:
-        st.session_state.test_started = False
+    if "test" not in st.session_state:
+        st.session_state.test = None
 
     if not st.session_state.bank_generated:
-        if st.button("Generate Question Bank"):
-            with st.spinner("Generating questions..."):
-                st.session_state.question_bank = generate_question_bank()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if st.button("Generate Question Bank"):
+                with st.spinner("Generating questions..."):
+                    st.session_state.question_bank = create_pooled_question_bank()
+                    st.session_state.bank_generated = True
+        with col2:
+            if st.button("Generate Questions On Demand"):
+                st.session_state.question_bank = create_lazy_question_bank()
+                st.session_state.bank_generated = True
+        with col3:
+            if st.button("Use Curated Question Bank"):
+                st.session_state.question_bank = create_offline_question_bank()
                 st.session_state.bank_generated = True
 
-    if st.session_state.bank_generated and not st.session_state.test_started:
+    test = st.session_state.test
+    if st.session_state.bank_generated and test is None:
         st.subheader("Test Settings")
         initial_difficulty = st.radio(
             "Select your preferred starting difficulty level:",
@@ -228,169 +685,106 @@ def main():
             index=1,
             horizontal=True
         )
-        if st.button("Start Test"):
-            st.session_state.test_started = True
-            st.session_state.difficulty = initial_difficulty
-            st.session_state.current_question_number = 1
-            st.session_state.difficulty_streak = 0
-            initial_question = st.session_state.question_bank[initial_difficulty][0]
-            st.session_state.selected_questions.append(initial_question)
-            st.session_state.difficulty_history.append(initial_difficulty)
-            st.session_state.question_bank[initial_difficulty].pop(0)
-            st.rerun()
-
-    if st.session_state.test_started and st.session_state.current_question_number <= 10:
-        current_q = st.session_state.selected_questions[-1]
-        col1, col2 = st.columns([7, 3])
-        with col1:
-            st.write(f"Question {st.session_state.current_question_number} of 10")
-            st.progress(st.session_state.current_question_number / 10)
-        with col2:
-            st.info(f"Current difficulty: {st.session_state.difficulty_history[-1].capitalize()}")
-        st.markdown(f"**{current_q['question']}**")
-        user_answer = st.radio("Select your answer:", current_q["choices"], key=f"q{st.session_state.current_question_number}")
-        if st.button("Submit Answer"):
-            correct_answer = current_q["correct_answer"]
-            was_correct = user_answer.startswith(correct_answer)
-            st.session_state.answers.append(was_correct)
-            if was_correct:
-                st.success(f"Correct! The answer is {correct_answer}.")
-            else:
-                st.error(f"Incorrect. The correct answer is {correct_answer}.")
-            new_difficulty, new_streak = update_difficulty(
-                was_correct, 
-                st.session_state.difficulty_history[-1],
-                st.session_state.difficulty_streak
+        bank = st.session_state.question_bank
+        engine = ENGINE_RULE_BASED
+        if isinstance(bank, PooledQuestionBank):
+            engine = st.radio(
+                "Adaptive engine:",
+                options=[ENGINE_RULE_BASED, ENGINE_IRT],
+                horizontal=True,
+                help="Item response theory picks the most informative question for your estimated ability after every answer."
             )
-            st.session_state.difficulty = new_difficulty
-            st.session_state.difficulty_streak = new_streak
-            if st.session_state.current_question_number < 10:
-                if new_difficulty != st.session_state.difficulty_history[-1]:
-                    if new_difficulty == "hard":
-                        st.success("Great job! The next question will be harder.")
-                    elif new_difficulty == "easy":
-                        st.info("The next question will be easier.")
-                    else:
-                        st.info(f"Adjusting difficulty to {new_difficulty}.")
-                if st.session_state.question_bank[new_difficulty]:
-                    next_question = st.session_state.question_bank[new_difficulty][0]
-                    st.session_state.selected_questions.append(next_question)
-                    st.session_state.difficulty_history.append(new_difficulty)
-                    st.session_state.question_bank[new_difficulty].pop(0)
+        if isinstance(bank, LazyQuestionBank):
+            # Start on the first question while the user is still on this screen
+            bank.warm(initial_difficulty)
+        if st.button("Start Test"):
+            with st.spinner("Preparing your first question..."):
+                if engine == ENGINE_IRT:
+                    irt, questions = start_irt_session(bank.pool, initial_difficulty)
+                    new_test = TestSession(bank, irt=irt, irt_questions=questions)
                 else:
-                    fallback_difficulties = [d for d in ["easy", "medium", "hard"] if st.session_state.question_bank[d]]
-                    if fallback_difficulties:
-                        fallback_diff = fallback_difficulties[0]
-                        next_question = st.session_state.question_bank[fallback_diff][0]
-                        st.session_state.selected_questions.append(next_question)
-                        st.session_state.difficulty_history.append(fallback_diff)
-                        st.session_state.question_bank[fallback_diff].pop(0)
-                        st.warning(f"No more questions available at {new_difficulty} difficulty. Using {fallback_diff} instead.")
-                    else:
-                        st.error("No more questions available in the bank. Test will end now.")
-                        st.session_state.current_question_number = 10
-                st.session_state.current_question_number += 1
-                time.sleep(1)
-                st.rerun()
+                    new_test = TestSession(bank)
+                with span("draw_question", difficulty=initial_difficulty):
+                    started = new_test.start(initial_difficulty, question_preview(st.empty()))
+            if not started:
+                st.error("No more questions available in the bank.")
             else:
-                st.session_state.current_question_number += 1
-                st.write("Test complete! View your results below.")
-                time.sleep(1)
+                st.session_state.test = new_test
+                st.session_state.attempt_id = uuid.uuid4().hex
                 st.rerun()
 
-    if st.session_state.test_started and st.session_state.current_question_number > 10:
-        st.header("Test Results")
-        score_data = calculate_adaptive_score(st.session_state.difficulty_history, st.session_state.answers)
-        col1, col2, col3 = st.columns(3)
+    for kind, message in st.session_state.pop("feedback", []):
+        getattr(st, kind)(message)
+
+    if test is not None and test.pending is not None:
+        # Draw the question picked by submit_answer, previewing it while it streams in
+        requested = test.pending_difficulty
+        preview = st.empty()
+        with span("draw_question", difficulty=requested):
+            next_difficulty = test.advance(question_preview(preview))
+        preview.empty()
+        if next_difficulty is None:
+            st.error("No more questions available in the bank. Test will end now.")
+        elif next_difficulty != requested:
+            st.warning(f"No more questions available at {requested} difficulty. Using {next_difficulty} instead.")
+
+    if test is not None and not test.finished:
+        current_q = test.question
+        if st.session_state.get("shown_question") != test.number:
+            # Start the answer clock the first time this question is rendered
+            st.session_state.shown_question = test.number
+            st.session_state.shown_at = time.monotonic()
+        col1, col2 = st.columns([7, 3])
         with col1:
-            st.metric("Raw Score", f"{score_data['raw_score']}/{score_data['max_score']}")
+            st.write(f"Question {test.number} of {test.length}")
+            st.progress(test.number / test.length)
         with col2:
-            st.metric("Percentage", f"{score_data['percentage']:.1f}%")
-        with col3:
-            st.metric("Weighted Score", f"{score_data['weighted_score']}")
-        st.subheader("Your Difficulty Progression")
-        fig, ax = plt.subplots(figsize=(10, 5))
-        difficulty_numeric = [{"easy": 1, "medium": 2, "hard": 3}[d] for d in st.session_state.difficulty_history]
-        ax.plot(range(1, 11), difficulty_numeric, marker='o', linestyle='-', color='blue', linewidth=2)
-        for i, correct in enumerate(st.session_state.answers):
-            color = 'green' if correct else 'red'
-            ax.plot(i+1, difficulty_numeric[i], marker='o', markersize=10, color=color)
-        ax.set_yticks([1, 2, 3])
-        ax.set_yticklabels(['Easy', 'Medium', 'Hard'])
-        ax.set_xticks(range(1, 11))
-        ax.set_xlabel('Question Number')
-        ax.set_ylabel('Difficulty Level')
-        ax.grid(True, linestyle='--', alpha=0.7)
-        ax.set_title('Difficulty Progression Throughout the Test')
-        from matplotlib.lines import Line2D
-        legend_elements = [
-            Line2D([0], [0], marker='o', color='w', markerfacecolor='green', markersize=10, label='Correct Answer'),
-            Line2D([0], [0], marker='o', color='w', markerfacecolor='red', markersize=10, label='Incorrect Answer')
-        ]
-        ax.legend(handles=legend_elements)
-        st.pyplot(fig)
-        st.subheader("Question Details")
-        summary_data = {
-            "Question": [f"Q{i+1}" for i in range(10)],
-            "Difficulty": st.session_state.difficulty_history,
-            "Result": ["✓" if ans else "✗" for ans in st.session_state.answers],
-            "Points": [{"easy": 1, "medium": 2, "hard": 3}[diff] if ans else 0 
-                      for diff, ans in zip(st.session_state.difficulty_history, st.session_state.answers)]
-        }
-        summary_df = pd.DataFrame(summary_data)
-        def highlight_result(val):
-            color = 'lightgreen' if val == "✓" else 'lightcoral' if val == "✗" else ''
-            return f'background-color: {color}'
-        styled_df = summary_df.style.applymap(highlight_result, subset=['Result'])
-        st.write(styled_df)
-        st.subheader("Performance Analysis")
-        difficulty_stats = {}
-        for diff in ["easy", "medium", "hard"]:
-            questions = [i for i, d in enumerate(st.session_state.difficulty_history) if d == diff]
-            if questions:
-                correct = sum(st.session_state.answers[i] for i in questions)
-                total = len(questions)
-                difficulty_stats[diff] = {
-                    "correct": correct,
-                    "total": total,
-                    "percentage": round((correct / total) * 100, 1) if total > 0 else 0
-                }
-        cols = st.columns(3)
-        for i, diff in enumerate(["easy", "medium", "hard"]):
-            if diff in difficulty_stats:
-                with cols[i]:
-                    st.metric(
-                        f"{diff.capitalize()} Questions", 
-                        f"{difficulty_stats[diff]['correct']}/{difficulty_stats[diff]['total']}",
-                        f"{difficulty_stats[diff]['percentage']}%"
-                    )
-        st.subheader("Skill Assessment")
-        if score_data['percentage'] >= 80:
-            if difficulty_stats.get('hard', {}).get('percentage', 0) >= 70:
-                assessment = "Advanced"
-                description = "You have mastered most GMAT quantitative concepts."
-            elif difficulty_stats.get('medium', {}).get('percentage', 0) >= 70:
-                assessment = "Proficient"
-                description = "You have solid understanding of most GMAT quantitative concepts."
-            else:
-                assessment = "Intermediate"
-                description = "You have good grasp of basic concepts but should work on harder problems."
-        elif score_data['percentage'] >= 60:
-            assessment = "Developing"
-            description = "You understand foundational concepts but need more practice with medium and hard problems."
-        else:
-            assessment = "Foundational"
-            description = "Focus on strengthening your understanding of basic GMAT quantitative concepts."
-        st.info(f"**Overall Assessment: {assessment}**\n\n{description}")
+            st.info(f"Current difficulty: {test.difficulty.capitalize()}")
+        st.markdown(f"**{current_q['question']}**")
+        st.radio("Select your answer:", current_q["choices"], key=f"q{test.number}")
+        st.button("Submit Answer", on_click=submit_answer)
+
+    if test is not None and test.finished:
+        with span("render_results"):
+            st.header("Test Results")
+            difficulty_history, answers = test.difficulty_history(), test.answers()
+            with span("results_view"):
+                results = build_results_view(difficulty_history, answers)
+            score_data = results["score_data"]
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Raw Score", f"{score_data['raw_score']}/{score_data['max_score']}")
+            with col2:
+                st.metric("Percentage", f"{score_data['percentage']:.1f}%")
+            with col3:
+                st.metric("Weighted Score", f"{score_data['weighted_score']}")
+            st.subheader("Your Difficulty Progression")
+            st.plotly_chart(build_progression_figure(difficulty_history, answers))
+            st.subheader("Question Details")
+            st.dataframe(build_results_table(difficulty_history, answers), hide_index=True)
+            st.subheader("Performance Analysis")
+            difficulty_stats = results["difficulty_stats"]
+            cols = st.columns(3)
+            for i, diff in enumerate(["easy", "medium", "hard"]):
+                if diff in difficulty_stats:
+                    with cols[i]:
+                        st.metric(
+                            f"{diff.capitalize()} Questions", 
+                            f"{difficulty_stats[diff]['correct']}/{difficulty_stats[diff]['total']}",
+                            f"{difficulty_stats[diff]['percentage']}%"
+                        )
+            st.subheader("Skill Assessment")
+            assessment, description = results["assessment"]
+            st.info(f"**Overall Assessment: {assessment}**\n\n{description}")
+            if test.irt is not None:
+                irt = test.irt
+                st.caption(f"Estimated ability (θ): {irt.theta:+.2f} ± {irt.se:.2f}")
         if st.button("Take Another Test"):
-            st.session_state.test_started = False
-            st.session_state.current_question_number = 0
-            st.session_state.selected_questions = []
-            st.session_state.answers = []
-            st.session_state.difficulty_history = []
-            st.session_state.difficulty = "medium"
-            st.session_state.difficulty_streak = 0
+            st.session_state.test = None
             st.rerun()
 
+    if DEBUG_TIMINGS:
+        render_timings_panel()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,75 @@
+import numpy as np
+
+from question_banks import DIFFICULTIES, DIFFICULTY_CODES
+
+# Vectorised scoring of many finished tests at once, for cohort reports.
+# Attempts are rows of a 2-D array of difficulty codes (0 easy, 1 medium,
+# 2 hard, -1 for trailing padding when attempts differ in length) and a
+# matching array of correctness flags. Results match scoring.calculate_adaptive_score
+# and scoring.calculate_difficulty_stats exactly, including Python's rounding.
+
+DIFFICULTY_POINTS = np.array([1, 2, 3], dtype=np.int64)
+
+
+# Turn per-attempt lists of difficulty names and answers into padded arrays
+def encode_attempts(histories, answers):
+    width = max((len(h) for h in histories), default=0)
+    codes = np.full((len(histories), width), -1, dtype=np.int8)
+    correct = np.zeros((len(histories), width), dtype=bool)
+    for row, (history, attempt_answers) in enumerate(zip(histories, answers)):
+        codes[row, :len(history)] = [DIFFICULTY_CODES[d] for d in history]
+        correct[row, :len(history)] = attempt_answers[:len(history)]
+    return codes, correct
+
+
+# np.round rounds half to even on the binary value; Python's round() decides
+# ties on the exact decimal expansion. Redo the handful of values that sit
+# close enough to a tie for the two to disagree.
+def round_like_python(values, ndigits=1):
+    rounded = np.round(values, ndigits)
+    scaled = values * 10 ** ndigits
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie & np.isfinite(values)):
+        rounded.flat[i] = round(float(values.flat[i]), ndigits)
+    return rounded
+
+
+def score_attempts(difficulty_codes, correct):
+    codes = np.asarray(difficulty_codes)
+    correct = np.asarray(correct, dtype=bool)
+    valid = codes >= 0
+    correct = correct & valid
+    lengths = valid.sum(axis=1)
+
+    points = np.where(valid, DIFFICULTY_POINTS[np.clip(codes, 0, 2)], 0)
+    earned = np.where(correct, points, 0)
+    raw_score = earned.sum(axis=1)
+    max_score = points.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percentage = np.where(max_score > 0, (raw_score / max_score) * 100, 0.0)
+
+        # Same float operations, in the same order, as the single-attempt loop:
+        # weight (i + 1) / n, accumulated left to right (cumsum is sequential)
+        positions = np.arange(1, codes.shape[1] + 1, dtype=np.float64)
+        weights = np.where(valid, positions[None, :] / lengths[:, None], 0.0)
+        total_weight = np.cumsum(weights, axis=1)[:, -1] if codes.shape[1] else np.zeros(len(codes))
+        weighted = np.cumsum(earned * weights, axis=1)[:, -1] if codes.shape[1] else np.zeros(len(codes))
+        normalized = np.where(total_weight > 0, (weighted / total_weight) * lengths, 0.0)
+    weighted_score = round_like_python(normalized, 1)
+
+    per_difficulty = {}
+    for code, difficulty in enumerate(DIFFICULTIES):
+        asked = codes == code
+        total = asked.sum(axis=1)
+        right = (asked & correct).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            accuracy = round_like_python(np.where(total > 0, (right / total) * 100, np.nan), 1)
+        per_difficulty[difficulty] = {"correct": right, "total": total, "percentage": accuracy}
+
+    return {
+        "raw_score": raw_score,
+        "max_score": max_score,
+        "percentage": percentage,
+        "weighted_score": weighted_score,
+        "per_difficulty": per_difficulty,
+    }
@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GEM_API", "benchmark")
+
+# Micro-benchmarks for the pure functions on the answer path: the difficulty
+# transition, the headless session engine, scoring and skill assessment, and completion parsing, over
+# synthetic inputs including long histories, huge malformed completions and
+# pathological brace nesting. Each case is timed with timeit (auto-ranged,
+# best of --repeat) and compared with a stored baseline; cases slower than
+# --tolerance x baseline are flagged and the script exits non-zero.
+#
+#   python benchmarks/bench_core.py                 # compare with the baseline
+#   python benchmarks/bench_core.py --save          # record a new baseline
+#   python benchmarks/bench_core.py -k parse        # only cases matching "parse"
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "bench_core.json")
+
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+
+def synthetic_history(length, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice(DIFFICULTIES) for _ in range(length)], [rng.random() < 0.6 for _ in range(length)]
+
+
+def question_json(i=0):
+    return json.dumps({
+        "question": f"If x + {i} = {2 * i + 3}, what is the value of x?",
+        "choices": [f"{letter}. {i + n}" for n, letter in enumerate("ABCDE")],
+        "correct_answer": "C",
+    })
+
+
+# name -> zero-argument callable; setup runs once, outside the timing
+def build_cases():
+    from session_engine import TestSession, update_difficulty
+    from scoring import assess_skill, calculate_adaptive_score, calculate_difficulty_stats
+    from question_parser import (
+        QuestionParseError, extract_json_object, parse_question, parse_question_batch, parse_structured_question
+    )
+
+    cases = {}
+
+    _, answers = synthetic_history(10_000)
+
+    def walk_difficulty():
+        difficulty, streak = "medium", 0
+        for was_correct in answers:
+            difficulty, streak = update_difficulty(was_correct, difficulty, streak)
+
+    cases["update_difficulty.walk_10k"] = walk_difficulty
+
+    # 1,000 complete 10-question tests through the headless engine
+    draws = [random.Random(seed).random() < 0.6 for seed in range(10_000)]
+
+    def simulate_sessions():
+        answers = iter(draws)
+        for _ in range(1_000):
+            test = TestSession()
+            test.start("medium")
+            while not test.finished:
+                test.submit(next(answers))
+
+    cases["session_engine.simulate_1k"] = simulate_sessions
+
+    for length in (10, 1_000, 100_000):
+        history, attempt = synthetic_history(length)
+        cases[f"calculate_adaptive_score.{length}"] = lambda h=history, a=attempt: calculate_adaptive_score(h, a)
+        cases[f"calculate_difficulty_stats.{length}"] = lambda h=history, a=attempt: calculate_difficulty_stats(h, a)
+
+    history, attempt = synthetic_history(10)
+    score, stats = calculate_adaptive_score(history, attempt), calculate_difficulty_stats(history, attempt)
+    cases["assess_skill.single"] = lambda: assess_skill(score, stats)
+    cases["score_and_assess.10"] = lambda: assess_skill(
+        calculate_adaptive_score(history, attempt), calculate_difficulty_stats(history, attempt)
+    )
+
+    clean = question_json()
+    fenced = f"Sure! Here is your question:\n```json\n{question_json()}\n```\nGood luck!"
+    prose = ("The answer depends on the context given. " * 25_000) + question_json()
+    brace_prose = ("The answer {depends} on {context}. " * 30_000) + question_json()
+    trailing = question_json()[:-1] + ",}"
+    nested = '{"a": ' * 500 + "1" + "}" * 500
+    unterminated = '{"question": "' + "x" * 1_000_000
+    escapes = '{"question": "' + '\\"' * 200_000 + '", "choices": [], "correct_answer": "A"}'
+    brace_soup = "{[" * 50_000
+    batch = json.dumps({"questions": [json.loads(question_json(i)) for i in range(50)]})
+
+    def swallow(parse, text):
+        def run():
+            try:
+                parse(text)
+            except QuestionParseError:
+                pass
+        return run
+
+    cases["parse_structured_question.clean"] = lambda: parse_structured_question(clean)
+    cases["parse_question.fenced"] = lambda: parse_question(fenced)
+    cases["parse_question.trailing_comma"] = lambda: parse_question(trailing)
+    cases["parse_question.prose_1mb"] = lambda: parse_question(prose)
+    cases["parse_question.brace_prose_1mb"] = lambda: parse_question(brace_prose)
+    cases["extract_json_object.nested_500"] = lambda: extract_json_object(nested)
+    cases["extract_json_object.unterminated_1mb"] = swallow(extract_json_object, unterminated)
+    cases["extract_json_object.escaped_quotes_400k"] = swallow(extract_json_object, escapes)
+    cases["extract_json_object.brace_soup_100k"] = swallow(lambda t: extract_json_object(t, openers="{["), brace_soup)
+    cases["parse_question_batch.50"] = lambda: parse_question_batch(batch, 50)
+    return cases
+
+
+# Best per-call time in seconds: auto-range the loop count to ~0.2s, then
+# take the fastest of `repeat` runs
+def time_case(func, repeat):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for scoring, difficulty and parsing")
+    parser.add_argument("-k", dest="pattern", default="", help="only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="flag cases slower than this x baseline")
+    args = parser.parse_args()
+
+    cases = {name: func for name, func in build_cases().items() if args.pattern in name}
+    baseline = load_baseline(args.baseline)
+    reference = (baseline or {}).get("results", {})
+    if baseline and (baseline.get("machine"), baseline.get("python")) != (platform.machine(), platform.python_version()):
+        print(f"note: baseline was recorded on {baseline.get('machine')} / Python {baseline.get('python')}")
+
+    results = {}
+    regressions = []
+    print(f"{'case':<42} {'time':>10} {'baseline':>10} {'ratio':>7}")
+    for name, func in cases.items():
+        seconds = time_case(func, args.repeat)
+        results[name] = seconds
+        previous = reference.get(name)
+        ratio = seconds / previous if previous else None
+        flag = ""
+        if ratio is not None and ratio > args.tolerance:
+            regressions.append(name)
+            flag = "  SLOWER"
+        print(f"{name:<42} {format_time(seconds):>10} "
+              f"{format_time(previous) if previous else '-':>10} {f'{ratio:.2f}x' if ratio else '-':>7}{flag}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        merged = {**reference, **results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"machine": platform.machine(), "python": platform.python_version(),
+                       "results": dict(sorted(merged.items()))}, f, indent=2)
+            f.write("\n")
+        print(f"Saved {len(results)} results to {args.baseline}")
+    elif regressions:
+        ratios = [results[name] / reference[name] for name in regressions]
+        raise SystemExit(f"{len(regressions)} case(s) slower than {args.tolerance}x baseline "
+                         f"(median {statistics.median(ratios):.2f}x): {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_scoring import score_attempts
+from question_banks import DIFFICULTIES
+from scoring import calculate_adaptive_score, calculate_difficulty_stats
+
+# Per-attempt scoring loop vs the vectorised batch scorer on synthetic 10-question
+# attempts. The loop is timed on at most --loop-limit attempts and extrapolated
+# linearly, so the 1M row does not take minutes.
+#
+#   python benchmarks/bench_scoring.py --sizes 10000 1000000
+
+
+def synthetic_attempts(count, length, seed):
+    rng = np.random.default_rng(seed)
+    codes = rng.integers(0, 3, size=(count, length), dtype=np.int8)
+    correct = rng.random((count, length)) < 0.6
+    return codes, correct
+
+
+def score_with_loop(codes, correct):
+    results = []
+    for row_codes, row_correct in zip(codes.tolist(), correct.tolist()):
+        history = [DIFFICULTIES[c] for c in row_codes]
+        results.append((calculate_adaptive_score(history, row_correct), calculate_difficulty_stats(history, row_correct)))
+    return results
+
+
+def check_identical(codes, correct, batch, sample):
+    for i, (score, stats) in enumerate(score_with_loop(codes[:sample], correct[:sample])):
+        for key in ("raw_score", "max_score", "percentage", "weighted_score"):
+            assert score[key] == batch[key][i], (i, key, score[key], batch[key][i])
+        for difficulty, values in stats.items():
+            for key in ("correct", "total", "percentage"):
+                assert values[key] == batch["per_difficulty"][difficulty][key][i], (i, difficulty, key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch scoring against the per-attempt loop")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--length", type=int, default=10)
+    parser.add_argument("--loop-limit", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'attempts':>10} {'loop s':>10} {'batch s':>10} {'speedup':>9}")
+    for size in args.sizes:
+        codes, correct = synthetic_attempts(size, args.length, args.seed)
+        start = time.perf_counter()
+        batch = score_attempts(codes, correct)
+        batch_seconds = time.perf_counter() - start
+
+        timed = min(size, args.loop_limit)
+        start = time.perf_counter()
+        score_with_loop(codes[:timed], correct[:timed])
+        loop_seconds = (time.perf_counter() - start) * size / timed
+
+        check_identical(codes, correct, batch, min(size, 10_000))
+        note = "" if timed == size else f"  (loop extrapolated from {timed})"
+        print(f"{size:>10} {loop_seconds:>10.3f} {batch_seconds:>10.3f} {loop_seconds / batch_seconds:>8.1f}x{note}")
+
+
+if __name__ == "__main__":
+    main()
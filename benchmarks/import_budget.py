@@ -0,0 +1,79 @@
+import argparse
+import os
+import subprocess
+import sys
+
+# Import-time budget for the Streamlit entry point. Runs `python -X importtime`
+# on a fresh interpreter, reports the most expensive imports pulled in by the
+# module and fails when the total exceeds the budget or when a module that
+# should only load on demand (plotting, DataFrames, the LLM SDK) is imported.
+#
+#   python benchmarks/import_budget.py --budget-ms 1500
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_FORBIDDEN = ["matplotlib", "pandas", "numpy", "openai"]
+
+
+# Rows of (module, self_us, cumulative_us, depth) in importtime order: every
+# module is listed after the modules it imported
+def measure_imports(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Importing {module} failed:\n{result.stderr}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+# Modules imported directly by `module`, most expensive first
+def direct_imports(rows, module):
+    position = max(i for i, row in enumerate(rows) if row[0] == module)
+    depth = rows[position][3]
+    children = []
+    for row in reversed(rows[:position]):
+        if row[3] <= depth:
+            break
+        if row[3] == depth + 1:
+            children.append(row)
+    return rows[position], sorted(children, key=lambda row: row[2], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import-time cost of the app entry point")
+    parser.add_argument("--module", default="app2")
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--forbid", default=",".join(DEFAULT_FORBIDDEN),
+                        help="comma-separated packages that must not be imported at start-up")
+    args = parser.parse_args()
+
+    rows = measure_imports(args.module)
+    target, direct = direct_imports(rows, args.module)
+    total_ms = target[2] / 1000
+    print(f"Total import time for {args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"{'module':<50} {'cumulative ms':>14} {'self ms':>10}")
+    for name, self_us, cumulative_us, _ in direct[:args.top]:
+        print(f"{name:<50} {cumulative_us / 1000:>14.1f} {self_us / 1000:>10.1f}")
+
+    forbidden = [m for m in args.forbid.split(",") if m]
+    loaded = sorted({name.split(".")[0] for name, _, _, _ in rows} & set(forbidden))
+    failed = False
+    if loaded:
+        print(f"FAIL: loaded at start-up but should be imported lazily: {', '.join(loaded)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL: import time {total_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_llm_server import start_stub_server
+
+# End-to-end load benchmark: N simulated users each press a bank button, start
+# a test and answer all 10 questions, driven through Streamlit's AppTest
+# against app2.py. AppTest swaps a process-global runtime on every run, so it
+# cannot drive two sessions from one process at once: users run in a pool of
+# --concurrency worker processes instead. Each worker behaves like one server
+# process (its st.cache_resource state is reused by the users it serves), and
+# all workers share the on-disk question cache and the stub model server.
+# Every run starts from a fresh cache and event log. LLM_* and GEN_* settings
+# are taken from the environment as in the app. Reports p50/p95/p99 latency
+# per stage and overall throughput.
+#
+#   python benchmarks/load_test.py --users 20 --concurrency 4 --bank pooled --latency 0.5
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, "app2.py")
+
+BANK_BUTTONS = {
+    "pooled": "Generate Question Bank",
+    "on-demand": "Generate Questions On Demand",
+    "curated": "Use Curated Question Bank",
+}
+
+STAGES = ["bank", "start", "answer", "test"]
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def click(at, label):
+    for button in at.button:
+        if button.label == label:
+            return button.click().run()
+    raise RuntimeError(f"No '{label}' button on the page")
+
+
+# One user's full session; returns {stage: [seconds, ...]}
+def simulate_user(bank, seed, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    timings = {stage: [] for stage in STAGES}
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout).run()
+
+    started = time.perf_counter()
+    click(at, BANK_BUTTONS[bank])
+    timings["bank"].append(time.perf_counter() - started)
+
+    test_started = time.perf_counter()
+    click(at, "Start Test")
+    timings["start"].append(time.perf_counter() - test_started)
+
+    for _ in range(10):
+        if not any(button.label == "Submit Answer" for button in at.button):
+            break
+        answer = at.radio(key=f"q{at.session_state.test.number}")
+        answer.set_value(rng.choice(answer.options))
+        submitted = time.perf_counter()
+        click(at, "Submit Answer")
+        timings["answer"].append(time.perf_counter() - submitted)
+    timings["test"].append(time.perf_counter() - test_started)
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive simulated users through app2 against the stub model")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--bank", choices=sorted(BANK_BUTTONS), default="pooled")
+    parser.add_argument("--latency", type=float, default=0.5, help="stub seconds per completion")
+    parser.add_argument("--jitter", type=float, default=0.25)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds allowed per script run")
+    args = parser.parse_args()
+
+    server, model, base_url = start_stub_server(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate, seed=args.seed
+    )
+    workdir = tempfile.mkdtemp(prefix="gmat-load-")
+    os.environ.update({
+        "GEM_API": "stub",
+        "LLM_BASE_URL": base_url,
+        "QUESTION_CACHE_PATH": os.path.join(workdir, "question_cache.db"),
+        "EVENT_LOG_PATH": os.path.join(workdir, "events.db"),
+        "DEDUP_INDEX_PATH": os.path.join(workdir, "question_index"),
+        # The stub rotates through a fixed set of questions, which a paraphrase
+        # filter would keep rejecting
+        "DEDUP_MODE": os.environ.get("DEDUP_MODE", "off"),
+    })
+
+    # Submitted by module name: AppTest rebinds __main__ to app2 inside workers
+    import load_test
+
+    timings = {stage: [] for stage in STAGES}
+    failures = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(load_test.simulate_user, args.bank, args.seed + i, args.timeout) for i in range(args.users)]
+        for future in futures:
+            try:
+                for stage, values in future.result().items():
+                    timings[stage].extend(values)
+            except Exception as e:
+                failures += 1
+                print(f"user failed: {e}", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    print(f"{args.users} users, concurrency {args.concurrency}, {args.bank} bank, stub latency {args.latency}s")
+    print(f"{'stage':<8} {'count':>6} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'max s':>8}")
+    for stage in STAGES:
+        values = timings[stage]
+        print(f"{stage:<8} {len(values):>6} {percentile(values, 50):>8.3f} {percentile(values, 95):>8.3f} "
+              f"{percentile(values, 99):>8.3f} {max(values, default=float('nan')):>8.3f}")
+    completed = len(timings["test"])
+    print(f"wall {elapsed:.1f}s, {completed / elapsed:.2f} tests/s, {len(timings['answer']) / elapsed:.2f} answers/s, "
+          f"{failures} failed users")
+    print(f"stub: {model.counts}")
+
+
+if __name__ == "__main__":
+    main()
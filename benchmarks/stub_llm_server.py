@@ -0,0 +1,240 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from question_source import load_question_index
+
+# Local OpenAI-compatible stand-in for the question model, so performance work
+# can be measured offline and repeatably. POST /chat/completions answers with
+# questions from trials/gmat_question_bank.json: one question object, or
+# {"questions": [...]} with one entry per numbered request for batch prompts.
+# Requests with "stream": true are answered as server-sent chat.completion.chunk
+# events, the first after `first_token` of the latency and the rest spread over
+# the remainder. Latency, HTTP error rate (429 with Retry-After, or 500) and the
+# rate of malformed JSON bodies are configurable; one seeded RNG drives all of them.
+# --reject-response-format answers any request carrying response_format with a 400,
+# like endpoints without structured output.
+#
+#   python benchmarks/stub_llm_server.py --port 8765 --latency 0.8 --error-rate 0.05
+#   LLM_BASE_URL=http://127.0.0.1:8765/v1/ GEM_API=stub streamlit run app2.py
+
+BANK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "trials", "gmat_question_bank.json")
+
+DIFFICULTY_WORDS = [
+    ("medium", ("medium", "moderate")),
+    ("hard", ("hard", "challenging", "difficult")),
+    ("easy", ("easy", "basic", "simple", "straightforward")),
+]
+
+
+def prompt_difficulty(prompt):
+    text = prompt.lower()
+    for difficulty, words in DIFFICULTY_WORDS:
+        if any(word in text for word in words):
+            return difficulty
+    return None
+
+
+class StubModel:
+    def __init__(self, bank_path=BANK_PATH, latency=0.5, jitter=0.25, error_rate=0.0, malformed_rate=0.0, seed=0,
+                 first_token=0.2, reject_response_format=False):
+        self.latency = latency
+        self.reject_response_format = reject_response_format
+        self.first_token = first_token
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        index = load_question_index(bank_path)
+        self._questions = {
+            d: itertools.cycle([index.get(d, i) for i in range(index.count(d))]) for d in ("easy", "medium", "hard")
+        }
+        self._any = itertools.cycle(index.questions())
+        self.counts = {"requests": 0, "errors": 0, "malformed": 0, "questions": 0, "format_rejected": 0}
+
+    def _draw(self):
+        with self._lock:
+            return self._rng.random(), self._rng.random(), self._rng.uniform(-self.jitter, self.jitter)
+
+    def _question(self, prompt):
+        difficulty = prompt_difficulty(prompt)
+        with self._lock:
+            question = next(self._questions[difficulty] if difficulty else self._any)
+            self.counts["questions"] += 1
+        return {
+            "question": question["question"],
+            "choices": list(question["choices"]),
+            "correct_answer": question["correct_answer"],
+        }
+
+    # (status, headers, body) for one chat completion request; a streamed body is
+    # an iterator of server-sent event bytes
+    def respond(self, request):
+        error_draw, malformed_draw, jitter = self._draw()
+        delay = max(self.latency + jitter * self.latency, 0.0)
+        streaming = bool(request.get("stream"))
+        time.sleep(delay * self.first_token if streaming else delay)
+        with self._lock:
+            self.counts["requests"] += 1
+        if error_draw < self.error_rate:
+            with self._lock:
+                self.counts["errors"] += 1
+            if error_draw < self.error_rate / 2:
+                return 429, {"Retry-After": "0.1"}, {"error": {"message": "Rate limited by stub", "type": "rate_limit"}}
+            return 500, {}, {"error": {"message": "Stub server error", "type": "server_error"}}
+        if self.reject_response_format and request.get("response_format"):
+            with self._lock:
+                self.counts["format_rejected"] += 1
+            return 400, {}, {"error": {"message": "response_format is not supported", "type": "invalid_request_error"}}
+
+        messages = request.get("messages", [])
+        system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+        prompt = " ".join(m.get("content", "") for m in messages if m.get("role") == "user")
+        if "numbered question requests" in system:
+            lines = re.findall(r"^\s*\d+\.\s*(.+)$", prompt, flags=re.MULTILINE) or [prompt]
+            content = json.dumps({"questions": [self._question(line) for line in lines]})
+        else:
+            content = json.dumps(self._question(prompt))
+        if malformed_draw < self.malformed_rate:
+            with self._lock:
+                self.counts["malformed"] += 1
+            content = "Here is your question:\n" + content[: len(content) // 2]
+        if streaming:
+            return 200, {}, stream_events(request.get("model", "stub"), content, delay * (1 - self.first_token))
+        return 200, {}, completion_body(request.get("model", "stub"), content)
+
+
+def completion_body(model, content):
+    return {
+        "id": f"chatcmpl-stub-{time.monotonic_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+# Server-sent chat.completion.chunk events for `content`, spread over `duration` seconds
+def stream_events(model, content, duration, piece_size=12):
+    pieces = [content[i:i + piece_size] for i in range(0, len(content), piece_size)]
+    chunk_id = f"chatcmpl-stub-{time.monotonic_ns()}"
+    created = int(time.time())
+
+    def event(delta, finish_reason=None):
+        body = {
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(body)}\n\n".encode("utf-8")
+
+    yield event({"role": "assistant", "content": ""})
+    for piece in pieces:
+        yield event({"content": piece})
+        time.sleep(duration / len(pieces))
+    yield event({}, "stop")
+    yield b"data: [DONE]\n\n"
+
+
+def make_handler(model):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send(404, {}, {"error": {"message": f"Unknown path {self.path}"}})
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                self._send(400, {}, {"error": {"message": "Request body is not JSON"}})
+                return
+            self._send(*model.respond(request))
+
+        def _send(self, status, headers, body):
+            if not isinstance(body, dict):
+                self._stream(status, headers, body)
+                return
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        # Without a length the event stream ends when the connection closes
+        def _stream(self, status, headers, events):
+            self.send_response(status)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.close_connection = True
+            for event in events:
+                self.wfile.write(event)
+                self.wfile.flush()
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+# Start a stub server on a background thread; returns (server, model, base_url)
+def start_stub_server(host="127.0.0.1", port=0, **model_options):
+    model = StubModel(**model_options)
+    server = ThreadingHTTPServer((host, port), make_handler(model))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-llm-server", daemon=True).start()
+    return server, model, f"http://{host}:{server.server_address[1]}/v1/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local OpenAI-compatible stub of the question model")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="mean seconds per completion")
+    parser.add_argument("--jitter", type=float, default=0.25, help="+/- fraction of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction answered with 429/500")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction answered with broken JSON")
+    parser.add_argument("--first-token", type=float, default=0.2,
+                        help="fraction of the latency before the first streamed chunk")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bank", default=BANK_PATH)
+    parser.add_argument("--reject-response-format", action="store_true", help="answer response_format requests with 400")
+    args = parser.parse_args()
+
+    server, model, base_url = start_stub_server(
+        args.host, args.port, bank_path=args.bank, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, malformed_rate=args.malformed_rate, seed=args.seed, first_token=args.first_token,
+        reject_response_format=args.reject_response_format
+    )
+    print(f"Stub LLM listening on {base_url} (set LLM_BASE_URL to this)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(model.counts)
+
+
+if __name__ == "__main__":
+    main()
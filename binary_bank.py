@@ -0,0 +1,241 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+from collections.abc import Sequence
+from types import MappingProxyType
+
+from question_banks import DIFFICULTIES
+
+# Compact, memory-mapped question bank for large item pools. The file is opened
+# read-only with mmap, so every worker process shares one page-cached copy and
+# opening it only reads the header and the section/template names; a question is
+# decoded from its fixed-width item record and the string heap whenever it is
+# served, and IRT item tables are built from the records without decoding any
+# text. Items are stored in serving order (deduplicated and interleaved by topic,
+# exactly as load_question_index orders the JSON bank), easy to hard, so a
+# difficulty is one contiguous run of records.
+#
+#   header    MAGIC, version, item/section/template/string counts, items per
+#             difficulty, and the offsets of the three tables below
+#   items     ITEM records: question id (8 bytes), difficulty, correct answer,
+#             choice count, section id, template id, IRT a/b/c, first string
+#   strings   string_count + 1 uint32 offsets into the heap; strings 0.. are
+#             the section names, then the template names, then per item its
+#             question text followed by its choices
+#   heap      UTF-8 text
+#
+#   python binary_bank.py trials/gmat_question_bank.json question_bank.bank --item-params item_params.csv
+
+MAGIC = b"GMATBANK"
+VERSION = 1
+
+HEADER = struct.Struct("<8sHxxIIII3IQQQ")
+ITEM = struct.Struct("<8sBBBxHHfffI")
+OFFSET = struct.Struct("<I")
+
+ANSWER_LETTERS = "ABCDE"
+
+
+def is_binary_bank(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+# Read-only question pool backed by a bank file; serves PooledQuestionBank, IRT
+# tests and the failover draw the same way as a QuestionIndex
+class MappedQuestionIndex:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self._item_count, section_count, template_count, self._string_count,
+         *counts, self._items_offset, self._strings_offset, self._heap_offset) = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} question bank file")
+        self._start = {}
+        self._count = {}
+        start = 0
+        for difficulty, count in zip(DIFFICULTIES, counts):
+            self._start[difficulty] = start
+            self._count[difficulty] = count
+            start += count
+        self.sections = [self._string(i) for i in range(section_count)]
+        self.templates = [self._string(section_count + i) for i in range(template_count)]
+        self.ready = True
+
+    def close(self):
+        self._map.close()
+
+    def _string(self, i):
+        start, end = struct.unpack_from("<II", self._map, self._strings_offset + OFFSET.size * i)
+        return self._map[self._heap_offset + start:self._heap_offset + end].decode("utf-8")
+
+    def _record(self, item):
+        return ITEM.unpack_from(self._map, self._items_offset + ITEM.size * item)
+
+    # Decoded on every call and never cached, so a worker only holds the
+    # questions its sessions are currently showing
+    def _question(self, item):
+        raw_id, difficulty, answer, choice_count, section, template, _, _, _, first = self._record(item)
+        return MappingProxyType({
+            "question": self._string(first),
+            "choices": tuple(self._string(first + 1 + i) for i in range(choice_count)),
+            "correct_answer": ANSWER_LETTERS[answer],
+            "difficulty": DIFFICULTIES[difficulty],
+            "section": self.sections[section],
+            "template": self.templates[template],
+            "id": raw_id.hex(),
+        })
+
+    def ensure_built(self, builder):
+        pass
+
+    def count(self, difficulty):
+        return self._count[difficulty]
+
+    def size(self):
+        return self._item_count
+
+    def get(self, difficulty, position):
+        return self._question(self._start[difficulty] + position)
+
+    # Every question, easy to hard, decoded only when indexed
+    def questions(self):
+        return MappedQuestions(self)
+
+    def lookup(self, difficulty, section=None, template=None):
+        section_id = self.sections.index(section) if section in self.sections else None
+        template_id = self.templates.index(template) if template in self.templates else None
+        if (section is not None and section_id is None) or (template is not None and template_id is None):
+            return []
+        start = self._start[difficulty]
+        matches = []
+        for item in range(start, start + self._count[difficulty]):
+            record = self._record(item)
+            if section_id in (None, record[4]) and template_id in (None, record[5]):
+                matches.append(self._question(item))
+        return matches
+
+    # Zero-copy NumPy view of the item records, one field per ITEM member
+    def item_table(self):
+        import numpy as np
+
+        dtype = np.dtype([
+            ("id", "V8"), ("difficulty", "u1"), ("correct_answer", "u1"), ("choice_count", "u1"), ("pad", "u1"),
+            ("section", "<u2"), ("template", "<u2"), ("a", "<f4"), ("b", "<f4"), ("c", "<f4"), ("first_string", "<u4"),
+        ])
+        return np.frombuffer(self._map, dtype=dtype, count=self._item_count, offset=self._items_offset)
+
+    # IRT item table over questions() from the stored parameters; params maps
+    # question id -> (a, b, c) to override them, e.g. with a newer calibration
+    def item_bank(self, params=None):
+        import numpy as np
+
+        from irt_engine import ItemBank
+
+        table = self.item_table()
+        hex_ids = table["id"].tobytes().hex()
+        ids = [hex_ids[i:i + 16] for i in range(0, len(hex_ids), 16)]
+        a, b, c = (table[field].astype(np.float64) for field in "abc")
+        if params:
+            position = {item_id: i for i, item_id in enumerate(ids)}
+            for item_id, (a_value, b_value, c_value) in params.items():
+                i = position.get(item_id)
+                if i is not None:
+                    a[i], b[i], c[i] = a_value, b_value, c_value
+        return ItemBank(ids, a, b, c)
+
+
+# Read-only sequence view of a bank file's questions, for TestSession's IRT items
+class MappedQuestions(Sequence):
+    def __init__(self, index):
+        self._index = index
+
+    def __len__(self):
+        return self._index.size()
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self._index._question(i) for i in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError(item)
+        return self._index._question(item)
+
+
+# Write `questions` (question dicts with id, difficulty, section and template, in
+# serving order) to `path`; params maps question id -> (a, b, c)
+def write_bank_file(path, questions, params=None):
+    from irt_engine import DEFAULT_ITEM_PARAMS
+
+    params = params or {}
+    questions = sorted(questions, key=lambda q: DIFFICULTIES.index(q["difficulty"]))
+    sections = list(dict.fromkeys(q["section"] for q in questions))
+    templates = list(dict.fromkeys(q["template"] for q in questions))
+    section_ids = {name: i for i, name in enumerate(sections)}
+    template_ids = {name: i for i, name in enumerate(templates)}
+
+    strings = sections + templates
+    items = bytearray()
+    for question in questions:
+        a, b, c = params.get(question["id"], DEFAULT_ITEM_PARAMS[question["difficulty"]])
+        items += ITEM.pack(
+            bytes.fromhex(question["id"]), DIFFICULTIES.index(question["difficulty"]),
+            ANSWER_LETTERS.index(question["correct_answer"]), len(question["choices"]),
+            section_ids[question["section"]], template_ids[question["template"]], a, b, c, len(strings),
+        )
+        strings.append(question["question"])
+        strings.extend(question["choices"])
+
+    heap = bytearray()
+    offsets = bytearray(OFFSET.pack(0))
+    for text in strings:
+        heap += text.encode("utf-8")
+        offsets += OFFSET.pack(len(heap))
+
+    counts = [sum(q["difficulty"] == d for q in questions) for d in DIFFICULTIES]
+    items_offset = HEADER.size
+    strings_offset = items_offset + len(items)
+    heap_offset = strings_offset + len(offsets)
+    header = HEADER.pack(MAGIC, VERSION, len(questions), len(sections), len(templates), len(strings),
+                         *counts, items_offset, strings_offset, heap_offset)
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(header)
+        f.write(items)
+        f.write(offsets)
+        f.write(heap)
+    os.replace(temporary, path)
+
+
+def convert(json_path, bank_path, item_params_path=None, dedupe_threshold=None):
+    from irt_engine import load_item_parameters
+    from question_source import DEDUPE_THRESHOLD, load_question_index
+
+    threshold = DEDUPE_THRESHOLD if dedupe_threshold is None else dedupe_threshold
+    index = load_question_index(json_path, threshold)
+    questions = index.questions()
+    write_bank_file(bank_path, questions, load_item_parameters(item_params_path))
+    return len(questions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a JSON question bank to the memory-mapped bank format")
+    parser.add_argument("json_path", help="bank in the trials/gmat_question_bank.json format")
+    parser.add_argument("bank_path", help="bank file to write")
+    parser.add_argument("--item-params", help="calibrated item parameters CSV from calibrate.py")
+    parser.add_argument("--dedupe-threshold", type=float, help="MinHash near-duplicate threshold (0 keeps all)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    count = convert(args.json_path, args.bank_path, args.item_params, args.dedupe_threshold)
+    size = os.path.getsize(args.bank_path)
+    print(f"Wrote {count} questions to {args.bank_path} ({size / 1024:.1f} KiB) in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+from minhash import MinHashIndex, DEFAULT_THRESHOLD
+from prompts import easy_prompts, medium_prompts, hard_prompts, STRUCTURED_INSTRUCTION
+from question_banks import DIFFICULTIES, question_id
+from question_parser import parse_structured_question, response_format, QuestionParseError
+
+# Offline bulk builder for large question banks, for the nightly refresh. Each
+# difficulty cycles through its prompt list and, unless --no-templates, one
+# prompt per (section, template) of that difficulty in the curated bank. Tasks
+# are cut into chunks and spread over a process pool; every worker answers its
+# chunk with an AsyncOpenAI client, --concurrency requests in flight at a time,
+# asking and parsing exactly like generate_question.
+#
+# Every finished task is appended to a JSON-lines checkpoint as its chunk comes
+# back, so an interrupted build picks up where it stopped. Accepted questions
+# are validated, exact and near duplicates (MinHash) are dropped, and difficulties
+# short of --per-difficulty are topped up with new tasks, up to --max-tasks-factor
+# x the target. The bank is written in the trials/gmat_question_bank.json format,
+# ready to serve with OFFLINE_BANK_PATH.
+#
+#   python build_bank.py -o generated_bank.json --per-difficulty 2000 --workers 8
+
+CURATED_BANK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trials", "gmat_question_bank.json")
+
+PROMPTS = {"easy": easy_prompts, "medium": medium_prompts, "hard": hard_prompts}
+
+GENERATED_SECTION = "Generated"
+
+TEMPLATE_PROMPT = (
+    "Generate a {difficulty} GMAT-style quantitative question in the area of {section}, "
+    "using the question pattern: {template}. Include five answer choices labeled A–E."
+)
+
+VARIATION_SUFFIX = " (Variation {n}: use different numbers and a different context from earlier versions.)"
+
+
+# (section, template, prompt) sources per difficulty
+def prompt_sources(curated_path=None):
+    sources = {d: [(GENERATED_SECTION, prompt, prompt) for prompt in PROMPTS[d]] for d in DIFFICULTIES}
+    if curated_path:
+        with open(curated_path, encoding="utf-8") as f:
+            data = json.load(f)
+        seen = set()
+        for section in data["sections"]:
+            for item in section["questions"]:
+                difficulty = item["difficulty"].strip().lower()
+                key = (difficulty, section["section"], item["template"])
+                if difficulty in sources and key not in seen:
+                    seen.add(key)
+                    prompt = TEMPLATE_PROMPT.format(
+                        difficulty=difficulty, section=section["section"], template=item["template"]
+                    )
+                    sources[difficulty].append((section["section"], item["template"], prompt))
+    return sources
+
+
+# The `seq`-th task of a difficulty; the id records its seq, so a resumed build
+# can tell which tasks the checkpoint already holds
+def make_task(difficulty, seq, sources):
+    section, template, prompt = sources[seq % len(sources)]
+    cycle = seq // len(sources)
+    if cycle:
+        prompt += VARIATION_SUFFIX.format(n=cycle)
+    return {"id": f"{difficulty}-{seq}", "difficulty": difficulty, "section": section,
+            "template": template, "prompt": prompt}
+
+
+# `state` is shared by the chunk's requests: once the endpoint refuses
+# response_format, the rest of the chunk asks without it
+async def generate_one(client, semaphore, task, settings, state):
+    from openai import BadRequestError
+
+    messages = [{"role": "system", "content": STRUCTURED_INSTRUCTION},
+                {"role": "user", "content": task["prompt"]}]
+    error = None
+    async with semaphore:
+        attempts = 0
+        while attempts < settings["max_attempts"]:
+            attempts += 1
+            request_format = state["request_format"]
+            options = {"response_format": request_format} if request_format else {}
+            try:
+                response = await client.chat.completions.create(model=settings["model"], messages=messages, **options)
+            except BadRequestError as e:
+                if request_format is None:
+                    error = str(e)
+                    break
+                # The endpoint refused response_format; ask again with the prompt alone
+                state["request_format"] = None
+                attempts -= 1
+                continue
+            except Exception as e:
+                # The SDK has already retried transient errors with backoff
+                error = str(e)
+                continue
+            text = response.choices[0].message.content if response.choices else None
+            try:
+                question = parse_structured_question(text)
+            except QuestionParseError as e:
+                error = str(e)
+                continue
+            return {**_task_fields(task), "question": question}
+    return {**_task_fields(task), "question": None, "error": error}
+
+
+def _task_fields(task):
+    return {key: task[key] for key in ("id", "difficulty", "section", "template")}
+
+
+async def generate_tasks(tasks, settings):
+    from openai import AsyncOpenAI
+
+    client = AsyncOpenAI(api_key=settings["api_key"], base_url=settings["base_url"],
+                         max_retries=settings["max_retries"], timeout=settings["timeout"])
+    semaphore = asyncio.Semaphore(settings["concurrency"])
+    state = {"request_format": response_format(settings["structured_output"])}
+    try:
+        return await asyncio.gather(*(generate_one(client, semaphore, task, settings, state) for task in tasks))
+    finally:
+        await client.close()
+
+
+# Worker entry point: one chunk of tasks on a fresh event loop
+def generate_chunk(tasks, settings):
+    return asyncio.run(generate_tasks(tasks, settings))
+
+
+# Accepted questions per difficulty, with exact and near-duplicate filtering
+class BankBuilder:
+    def __init__(self, target, dedupe_threshold=DEFAULT_THRESHOLD):
+        self.target = target
+        self.questions = {d: [] for d in DIFFICULTIES}
+        self.finished = {d: set() for d in DIFFICULTIES}
+        self.rejected = {"invalid": 0, "duplicate": 0, "near_duplicate": 0}
+        self._ids = set()
+        self._index = MinHashIndex(dedupe_threshold) if dedupe_threshold else None
+
+    def shortfall(self, difficulty):
+        return max(self.target - len(self.questions[difficulty]), 0)
+
+    def attempted(self, difficulty):
+        return len(self.finished[difficulty])
+
+    # The first `count` task seqs not finished yet, so gaps left by chunks that
+    # were still running when a build was interrupted are filled first
+    def next_seqs(self, difficulty, count):
+        seqs = []
+        seq = 0
+        while len(seqs) < count:
+            if seq not in self.finished[difficulty]:
+                seqs.append(seq)
+            seq += 1
+        return seqs
+
+    def consider(self, record):
+        difficulty = record["difficulty"]
+        seq = int(record["id"].rsplit("-", 1)[1])
+        if seq in self.finished[difficulty]:
+            return False
+        self.finished[difficulty].add(seq)
+        question = record.get("question")
+        if question is None:
+            self.rejected["invalid"] += 1
+            return False
+        if len(self.questions[difficulty]) >= self.target:
+            return False
+        text = question["question"]
+        if question_id(text) in self._ids:
+            self.rejected["duplicate"] += 1
+            return False
+        if self._index is not None and not self._index.admit(text):
+            self.rejected["near_duplicate"] += 1
+            return False
+        self._ids.add(question_id(text))
+        self.questions[difficulty].append(record)
+        return True
+
+    def accepted(self):
+        return sum(len(records) for records in self.questions.values())
+
+
+def read_checkpoint(path):
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted write; its task is simply redone
+                continue
+    return records
+
+
+# Open the checkpoint for appending, ending any line an interrupted write left open
+def open_checkpoint(path):
+    log = open(path, "a+", encoding="utf-8")
+    if log.tell():
+        log.seek(log.tell() - 1)
+        if log.read(1) != "\n":
+            log.write("\n")
+    return log
+
+
+# Curated-bank layout: sections of numbered questions with lettered options
+def bank_document(builder, model):
+    sections = {}
+    for difficulty in DIFFICULTIES:
+        for record in builder.questions[difficulty]:
+            question = record["question"]
+            options = {}
+            for letter, choice in zip("ABCDE", question["choices"]):
+                text = choice.strip()
+                if text[:2].upper() in (f"{letter}.", f"{letter})"):
+                    text = text[2:].strip()
+                options[letter] = text
+            sections.setdefault(record["section"], []).append({
+                "question_text": question["question"],
+                "template": record["template"],
+                "difficulty": difficulty.capitalize(),
+                "options": options,
+                "correct_answer": question["correct_answer"],
+            })
+    number = 0
+    document = {"model": model, "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "sections": []}
+    for section, questions in sections.items():
+        for question in questions:
+            number += 1
+            question["question_number"] = number
+        document["sections"].append({"section": section, "questions": questions})
+    return document
+
+
+def write_bank(path, document):
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=1)
+    os.replace(temporary, path)
+
+
+def chunked(items, size):
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Pre-build a large validated, deduplicated question bank")
+    parser.add_argument("-o", "--output", default="generated_bank.json")
+    parser.add_argument("--per-difficulty", type=int, default=1000, help="questions wanted per difficulty")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight per worker")
+    parser.add_argument("--chunk-size", type=int, default=50, help="tasks per worker chunk (checkpoint granularity)")
+    parser.add_argument("--checkpoint", help="JSON-lines progress file (default: OUTPUT.checkpoint.jsonl)")
+    parser.add_argument("--dedupe-threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="MinHash similarity treated as a near duplicate (0 keeps near duplicates)")
+    parser.add_argument("--max-tasks-factor", type=float, default=3.0,
+                        help="give up on a difficulty after this many tasks per wanted question")
+    parser.add_argument("--no-templates", action="store_true", help="only use the app's prompt lists")
+    parser.add_argument("--curated-bank", default=CURATED_BANK_PATH)
+    args = parser.parse_args()
+
+    settings = {
+        "api_key": os.getenv("GEM_API"),
+        "base_url": os.getenv("LLM_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/openai/"),
+        "model": os.getenv("LLM_MODEL", "gemini-2.5-flash"),
+        "structured_output": os.getenv("STRUCTURED_OUTPUT", "json_schema"),
+        "max_retries": int(os.getenv("LLM_MAX_RETRIES", "4")),
+        "timeout": 60.0,
+        "max_attempts": 3,
+        "concurrency": args.concurrency,
+    }
+    checkpoint_path = args.checkpoint or args.output + ".checkpoint.jsonl"
+    sources = prompt_sources(None if args.no_templates else args.curated_bank)
+    builder = BankBuilder(args.per_difficulty, args.dedupe_threshold)
+    for record in read_checkpoint(checkpoint_path):
+        builder.consider(record)
+    done = sum(builder.attempted(d) for d in DIFFICULTIES)
+    if done:
+        print(f"Resuming from {checkpoint_path}: {done} tasks done, "
+              f"{builder.accepted()} questions accepted")
+
+    started = time.perf_counter()
+    max_tasks = int(args.per_difficulty * args.max_tasks_factor)
+    with ProcessPoolExecutor(max_workers=args.workers) as executor, open_checkpoint(checkpoint_path) as log:
+        while True:
+            tasks = []
+            for difficulty in DIFFICULTIES:
+                count = min(builder.shortfall(difficulty), max_tasks - builder.attempted(difficulty))
+                tasks += [make_task(difficulty, seq, sources[difficulty]) for seq in builder.next_seqs(difficulty, count)]
+            if not tasks:
+                break
+            futures = [executor.submit(generate_chunk, chunk, settings) for chunk in chunked(tasks, args.chunk_size)]
+            for future in as_completed(futures):
+                for record in future.result():
+                    log.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    builder.consider(record)
+                log.flush()
+                os.fsync(log.fileno())
+                print(f"  {builder.accepted()} accepted "
+                      f"({', '.join(f'{d} {len(builder.questions[d])}' for d in DIFFICULTIES)}), "
+                      f"rejected {builder.rejected}, {time.perf_counter() - started:.0f}s", flush=True)
+
+    write_bank(args.output, bank_document(builder, settings["model"]))
+    short = {d: builder.shortfall(d) for d in DIFFICULTIES if builder.shortfall(d)}
+    print(f"Wrote {builder.accepted()} questions to {args.output}"
+          + (f"; short of the target after {max_tasks} tasks: {short}" if short else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from event_log import scan_events
+from irt_engine import probability_correct
+
+# Offline 2PL calibration of question parameters from logged responses, written
+# as the id,a,b,c table irt_engine.load_item_parameters reads (c is always 0).
+#
+# Fitting is marginal maximum likelihood by EM over a fixed ability quadrature
+# (Bock-Aitkin): the E-step streams the responses in chunks and accumulates,
+# per item and quadrature point, the expected number of attempts and of correct
+# answers; the M-step is a vectorised Fisher-scoring step for every item at
+# once on those counts. Memory is bounded by the chunk size plus two
+# items x quadrature arrays, whatever the number of responses.
+#
+# Input is the app's event log (event_log.py, read in session order) or a CSV
+# with session_id,question_id,correct columns and each session's responses on
+# consecutive rows (`sort -s -t, -k1,1` groups an interleaved log). The first pass packs it into a fixed-width binary file that later EM passes
+# read through a memory map.
+#
+#   python calibrate.py events.db -o item_params.csv
+
+QUADRATURE = np.linspace(-4.0, 4.0, 41)
+
+RESPONSE_DTYPE = np.dtype([("session", "<i4"), ("item", "<i4"), ("correct", "u1")])
+
+# Weak priors keep items answered (almost) always right or wrong finite:
+# b ~ N(0, 2^2), log a ~ N(0, 0.5^2)
+B_PRIOR_SD = 2.0
+LOG_A_PRIOR_SD = 0.5
+A_BOUNDS = (0.2, 4.0)
+B_BOUNDS = (-4.0, 4.0)
+
+
+def read_responses(path):
+    if path.endswith(".db"):
+        for rows in scan_events(path, ("session_id", "question_id", "correct"), by_session=True):
+            for session_id, question_id, correct in rows:
+                yield session_id, question_id, bool(correct)
+        return
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        session, question, correct = (header.index(name) for name in ("session_id", "question_id", "correct"))
+        for row in reader:
+            yield row[session], row[question], row[correct].strip().lower() in ("1", "true", "t", "yes")
+
+
+# Pack (session, question, correct) rows into `packed_path`, numbering sessions
+# in order of appearance and items by first sighting. Returns the item ids.
+def pack_responses(rows, packed_path, chunk_size):
+    item_index = {}
+    buffer = []
+    session = -1
+    previous = None
+    with open(packed_path, "wb") as out:
+        for session_id, question_id, correct in rows:
+            if session_id != previous:
+                session += 1
+                previous = session_id
+            buffer.append((session, item_index.setdefault(question_id, len(item_index)), correct))
+            if len(buffer) == chunk_size:
+                np.array(buffer, dtype=RESPONSE_DTYPE).tofile(out)
+                buffer.clear()
+        np.array(buffer, dtype=RESPONSE_DTYPE).tofile(out)
+    return list(item_index)
+
+
+# Row ranges of at most ~chunk_size rows that never split a session
+def session_chunks(sessions, chunk_size):
+    start, total = 0, len(sessions)
+    while start < total:
+        end = min(start + chunk_size, total)
+        if end < total:
+            cut = int(np.searchsorted(sessions, sessions[end], side="left"))
+            # A single session longer than the chunk is taken whole
+            end = cut if cut > start else int(np.searchsorted(sessions, sessions[end], side="right"))
+        yield start, end
+        start = end
+
+
+# Expected attempts and correct answers per item and quadrature point, and the
+# marginal log-likelihood, under the current parameters
+def expectation_step(responses, a, b, chunk_size):
+    log_prior = -0.5 * QUADRATURE ** 2
+    log_prior -= np.log(np.exp(log_prior).sum())
+    p = probability_correct(QUADRATURE, a, b).T
+    log_p, log_q = np.log(p), np.log1p(-p)
+
+    attempts = np.zeros_like(p)
+    correct_counts = np.zeros_like(p)
+    log_likelihood = 0.0
+    for start, end in session_chunks(responses["session"], chunk_size):
+        chunk = np.asarray(responses[start:end])
+        items = chunk["item"]
+        correct = chunk["correct"].astype(bool)
+        contributions = np.where(correct[:, None], log_p[items], log_q[items])
+
+        starts = np.flatnonzero(np.diff(chunk["session"], prepend=-1))
+        posterior = np.add.reduceat(contributions, starts, axis=0) + log_prior
+        peak = posterior.max(axis=1, keepdims=True)
+        weights = np.exp(posterior - peak)
+        totals = weights.sum(axis=1, keepdims=True)
+        log_likelihood += float((np.log(totals) + peak).sum())
+        weights /= totals
+
+        # Sum each row's session posterior into its item: sort rows by item and
+        # reduce the runs, which is much faster than np.add.at on 2-D rows
+        row_weights = weights[np.repeat(np.arange(len(starts)), np.diff(starts, append=len(chunk)))]
+        order = np.argsort(items, kind="stable")
+        sorted_items = items[order]
+        runs = np.flatnonzero(np.diff(sorted_items, prepend=-1))
+        sorted_weights = row_weights[order]
+        attempts[sorted_items[runs]] += np.add.reduceat(sorted_weights, runs, axis=0)
+        correct_counts[sorted_items[runs]] += np.add.reduceat(sorted_weights * correct[order, None], runs, axis=0)
+    return attempts, correct_counts, log_likelihood
+
+
+# One Fisher-scoring step on every item's expected complete-data log-likelihood
+def maximization_step(attempts, correct_counts, a, b):
+    offset = QUADRATURE[None, :] - b[:, None]
+    p = 1.0 / (1.0 + np.exp(-a[:, None] * offset))
+    residual = correct_counts - attempts * p
+    info = attempts * p * (1.0 - p)
+
+    grad_a = (residual * offset).sum(axis=1) - np.log(a) / (a * LOG_A_PRIOR_SD ** 2)
+    grad_b = -a * residual.sum(axis=1) - b / B_PRIOR_SD ** 2
+    info_aa = (info * offset ** 2).sum(axis=1) + 1.0 / (a * LOG_A_PRIOR_SD) ** 2
+    info_bb = a ** 2 * info.sum(axis=1) + 1.0 / B_PRIOR_SD ** 2
+    info_ab = -a * (info * offset).sum(axis=1)
+
+    det = info_aa * info_bb - info_ab ** 2
+    step_a = (info_bb * grad_a - info_ab * grad_b) / det
+    step_b = (info_aa * grad_b - info_ab * grad_a) / det
+    new_a = np.clip(a + np.clip(step_a, -0.5, 0.5), *A_BOUNDS)
+    new_b = np.clip(b + np.clip(step_b, -1.0, 1.0), *B_BOUNDS)
+    return new_a, new_b
+
+
+def calibrate(packed_path, item_count, max_iter=100, tol=1e-3, chunk_size=100_000, log=print):
+    responses = np.memmap(packed_path, dtype=RESPONSE_DTYPE, mode="r")
+    a = np.ones(item_count)
+    b = np.zeros(item_count)
+    counts = np.bincount(np.asarray(responses["item"]), minlength=item_count)
+    for iteration in range(1, max_iter + 1):
+        attempts, correct_counts, log_likelihood = expectation_step(responses, a, b, chunk_size)
+        new_a, new_b = maximization_step(attempts, correct_counts, a, b)
+        change = float(max(np.abs(new_a - a).max(initial=0.0), np.abs(new_b - b).max(initial=0.0)))
+        a, b = new_a, new_b
+        log(f"iteration {iteration}: log-likelihood {log_likelihood:.1f}, max parameter change {change:.5f}")
+        if change < tol:
+            break
+    return a, b, counts
+
+
+def write_parameters(path, item_ids, a, b, counts, min_responses):
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "a", "b", "c", "n"])
+        for item_id, item_a, item_b, n in zip(item_ids, a, b, counts):
+            if n >= min_responses:
+                writer.writerow([item_id, f"{item_a:.4f}", f"{item_b:.4f}", "0", int(n)])
+                written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit 2PL item parameters from logged responses")
+    parser.add_argument("responses", help="event log (.db) or CSV with session_id,question_id,correct grouped by session")
+    parser.add_argument("-o", "--output", default="item_params.csv")
+    parser.add_argument("--max-iter", type=int, default=100)
+    parser.add_argument("--tol", type=float, default=1e-3, help="stop when no a or b moves more than this")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="responses per E-step chunk")
+    parser.add_argument("--min-responses", type=int, default=20,
+                        help="items with fewer responses are left out and keep their default parameters")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    fd, packed_path = tempfile.mkstemp(suffix=".responses")
+    os.close(fd)
+    try:
+        item_ids = pack_responses(read_responses(args.responses), packed_path, args.chunk_size)
+        total = os.path.getsize(packed_path) // RESPONSE_DTYPE.itemsize
+        print(f"{total} responses to {len(item_ids)} items")
+        if not total:
+            return
+        a, b, counts = calibrate(packed_path, len(item_ids), args.max_iter, args.tol, args.chunk_size)
+    finally:
+        os.remove(packed_path)
+    written = write_parameters(args.output, item_ids, a, b, counts, args.min_responses)
+    print(f"Wrote {written} items to {args.output} in {time.perf_counter() - started:.1f}s "
+          f"({len(item_ids) - written} below {args.min_responses} responses)")
+
+
+if __name__ == "__main__":
+    main()
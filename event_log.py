@@ -0,0 +1,133 @@
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+
+# Append-only log of submitted answers. Sessions hand events to record(), which
+# only puts a tuple on an in-memory queue; a single writer thread drains the
+# queue and inserts whole batches into a SQLite table in WAL mode, so a submit
+# never waits on disk and readers can scan the table while it is being written.
+# If the writer falls too far behind, new events are dropped and counted
+# rather than blocking the session.
+
+# session_id: one id per test attempt; question_id: question_banks.question_id
+# of the question text; difficulty: 0 easy, 1 medium, 2 hard; latency_ms: time
+# from showing the question to submitting the answer
+EVENT_COLUMNS = ("session_id", "question_id", "difficulty", "correct", "latency_ms", "ts")
+
+_STOP = object()
+
+
+class EventLog:
+    def __init__(self, path, batch_size=256, flush_interval=1.0, max_pending=100_000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.accepted = 0
+        self.written = 0
+        self._count_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._flushed = threading.Condition()
+        self._closed = False
+        conn = sqlite3.connect(path)
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " session_id TEXT NOT NULL,"
+                " question_id TEXT NOT NULL,"
+                " difficulty INTEGER NOT NULL,"
+                " correct INTEGER NOT NULL,"
+                " latency_ms INTEGER,"
+                " ts REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_ts ON responses (ts)")
+        conn.close()
+        self._thread = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, session_id, question_id, difficulty, correct, latency_ms=None, ts=None):
+        event = (session_id, question_id, int(difficulty), int(bool(correct)),
+                 None if latency_ms is None else int(latency_ms), time.time() if ts is None else ts)
+        with self._count_lock:
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                self.dropped += 1
+                return False
+            self.accepted += 1
+        return True
+
+    def _run(self):
+        conn = sqlite3.connect(self.path)
+        # WAL keeps readers consistent; NORMAL skips the fsync on every commit
+        conn.execute("PRAGMA synchronous=NORMAL")
+        stop = False
+        while not stop:
+            batch = []
+            try:
+                event = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                event = None
+            deadline = time.monotonic() + self.flush_interval
+            while event is not None:
+                if event is _STOP:
+                    stop = True
+                    break
+                batch.append(event)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    event = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    event = None
+            if batch:
+                with conn:
+                    conn.executemany("INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?)", batch)
+            with self._flushed:
+                self.written += len(batch)
+                self._flushed.notify_all()
+        conn.close()
+
+    # Block until every event recorded so far is on disk (for tools and shutdown)
+    def flush(self, timeout=10.0):
+        target = self.accepted
+        with self._flushed:
+            return self._flushed.wait_for(lambda: self.written >= target or not self._thread.is_alive(), timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout=10.0)
+
+
+# Stream rows from the log in batches, optionally only some columns and only
+# events at or after `since`; by_session keeps each session's events together
+# in submission order. Uses its own read-only connection, so it can run while
+# the app is writing.
+def scan_events(path, columns=EVENT_COLUMNS, since=None, by_session=False, batch_size=10_000):
+    unknown = set(columns) - set(EVENT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown event columns: {', '.join(sorted(unknown))}")
+    query = f"SELECT {', '.join(columns)} FROM responses"
+    params = ()
+    if since is not None:
+        query += " WHERE ts >= ?"
+        params = (since,)
+    if by_session:
+        query += " ORDER BY session_id, rowid"
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
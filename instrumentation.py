@@ -0,0 +1,158 @@
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Lightweight timing spans for the hot paths (LLM calls, parsing, bank
+# building, answer submission, results rendering). Every finished span is
+# observed into a process-wide histogram per stage, optionally appended to a
+# caller-supplied sink (the current session's list, for the debug panel) and
+# optionally written as a JSON line with OpenTelemetry-style fields to a file.
+# The histograms, plus any registered counter collectors, are served as
+# Prometheus text by start_metrics_server().
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class StageMetrics:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._collectors = []
+        self._span_file = None
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram["counts"][i] += 1
+                    break
+
+    def snapshot(self):
+        with self._lock:
+            return {name: {"sum": h["sum"], "count": h["count"], "counts": list(h["counts"])}
+                    for name, h in self._histograms.items()}
+
+    # collector() -> {counter_name: value}, read at every scrape
+    def register_collector(self, prefix, collector):
+        with self._lock:
+            self._collectors.append((prefix, collector))
+
+    def export_spans_to(self, path):
+        with self._lock:
+            if self._span_file is not None:
+                self._span_file.close()
+            self._span_file = open(path, "a", encoding="utf-8", buffering=1) if path else None
+
+    def write_span(self, record):
+        if self._span_file is None:
+            return
+        line = json.dumps(record, default=str)
+        with self._lock:
+            if self._span_file is not None:
+                self._span_file.write(line + "\n")
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP gmat_stage_seconds Time spent per instrumented stage",
+            "# TYPE gmat_stage_seconds histogram",
+        ]
+        for name, histogram in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram["counts"]):
+                cumulative += count
+                lines.append(f'gmat_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'gmat_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram["count"]}')
+            lines.append(f'gmat_stage_seconds_sum{{stage="{name}"}} {histogram["sum"]:.6f}')
+            lines.append(f'gmat_stage_seconds_count{{stage="{name}"}} {histogram["count"]}')
+        with self._lock:
+            collectors = list(self._collectors)
+        for prefix, collector in collectors:
+            for counter, value in sorted(collector().items()):
+                metric = f"gmat_{prefix}_{counter}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = StageMetrics()
+
+_current_sink = contextvars.ContextVar("span_sink", default=None)
+
+
+# Send spans finished in the current thread (without an explicit sink) to
+# `sink`, any object with append(); None stops collecting
+def bind_sink(sink):
+    _current_sink.set(sink)
+
+
+def _finish(record, duration, sink):
+    record["end_time_unix_nano"] = record["start_time_unix_nano"] + int(duration * 1e9)
+    record["duration"] = duration
+    metrics.observe(record["name"], duration)
+    metrics.write_span(record)
+    if sink is None:
+        sink = _current_sink.get()
+    if sink is not None:
+        sink.append(record)
+
+
+# Time the enclosed block as stage `name`. The yielded record's "attributes"
+# can be filled in by the block (e.g. attempt counts); an exception is noted
+# on the record and re-raised.
+@contextmanager
+def span(name, sink=None, **attributes):
+    record = {"name": name, "start_time_unix_nano": time.time_ns(), "attributes": attributes}
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["status"] = {"code": "ERROR", "message": type(e).__name__}
+        raise
+    finally:
+        _finish(record, time.perf_counter() - started, sink)
+
+
+# Record a stage that was timed by the caller, e.g. time to first token
+def observe(name, seconds, sink=None, **attributes):
+    start = time.time_ns() - int(seconds * 1e9)
+    _finish({"name": name, "start_time_unix_nano": start, "attributes": attributes}, seconds, sink)
+
+
+# Slowest stages first: (name, count, total seconds, max seconds)
+def summarize(records):
+    totals = {}
+    for record in records:
+        count, total, longest = totals.get(record["name"], (0, 0.0, 0.0))
+        totals[record["name"]] = (count + 1, total + record["duration"], max(longest, record["duration"]))
+    return sorted(((name, *values) for name, values in totals.items()), key=lambda row: row[2], reverse=True)
+
+
+def start_metrics_server(port, host="127.0.0.1", registry=metrics):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
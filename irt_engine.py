@@ -0,0 +1,121 @@
+import csv
+import os
+
+import numpy as np
+
+# Item response theory engine for the adaptive test. Items follow the 3PL model
+# P(correct | theta) = c + (1 - c) / (1 + exp(-a (theta - b)))  (c = 0 gives 2PL).
+# Everything that depends on theta is precomputed on a fixed grid when the item
+# table is loaded: log P / log Q for the posterior update and, for every grid
+# point, the items ordered by Fisher information. A test step is then one
+# vector add over the grid, a binary search for the nearest grid point and a
+# walk down that point's ordering past the few items already administered.
+
+# Parameters used for items without a calibrated entry, by difficulty label
+DEFAULT_ITEM_PARAMS = {"easy": (1.0, -1.0, 0.0), "medium": (1.0, 0.0, 0.0), "hard": (1.0, 1.0, 0.0)}
+
+THETA_GRID = np.linspace(-4.0, 4.0, 81)
+
+
+def probability_correct(theta, a, b, c=0.0):
+    return c + (1.0 - c) / (1.0 + np.exp(-a * (np.subtract.outer(theta, b))))
+
+
+def fisher_information(theta, a, b, c=0.0):
+    p = probability_correct(theta, a, b, c)
+    return a ** 2 * ((1.0 - p) / p) * ((p - c) / (1.0 - c)) ** 2
+
+
+# Calibrated parameter table written by calibrate.py: CSV with id,a,b[,c]
+def load_item_parameters(path):
+    if not path or not os.path.exists(path):
+        return {}
+    params = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            params[row["id"]] = (float(row["a"]), float(row["b"]), float(row.get("c") or 0.0))
+    return params
+
+
+class ItemBank:
+    def __init__(self, ids, a, b, c=None, theta_grid=THETA_GRID, prior_sd=1.0):
+        self.ids = list(ids)
+        self.position = {item_id: i for i, item_id in enumerate(self.ids)}
+        self.a = np.asarray(a, dtype=np.float64)
+        self.b = np.asarray(b, dtype=np.float64)
+        self.c = np.zeros_like(self.a) if c is None else np.asarray(c, dtype=np.float64)
+        self.theta_grid = np.asarray(theta_grid, dtype=np.float64)
+        p = probability_correct(self.theta_grid, self.a, self.b, self.c)
+        self.log_p = np.log(p)
+        self.log_q = np.log1p(-p)
+        information = fisher_information(self.theta_grid, self.a, self.b, self.c)
+        # order[g] lists item positions from most to least informative at grid point g
+        self.order = np.argsort(-information, axis=1, kind="stable").astype(np.int32)
+        self.log_prior = -0.5 * (self.theta_grid / prior_sd) ** 2
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Item table for pool questions: calibrated parameters where available,
+    # otherwise the defaults for the question's difficulty label
+    @classmethod
+    def from_questions(cls, questions, params=None, **kwargs):
+        params = params or {}
+        ids, rows = [], []
+        for question in questions:
+            ids.append(question["id"])
+            rows.append(params.get(question["id"], DEFAULT_ITEM_PARAMS[question["difficulty"]]))
+        a, b, c = zip(*rows) if rows else ((), (), ())
+        return cls(ids, a, b, c, **kwargs)
+
+    def nearest_grid_point(self, theta):
+        g = int(np.searchsorted(self.theta_grid, theta))
+        if g == len(self.theta_grid):
+            return g - 1
+        if g > 0 and theta - self.theta_grid[g - 1] < self.theta_grid[g] - theta:
+            return g - 1
+        return g
+
+
+# Ability estimate and item selection for one test taker
+class IRTSession:
+    __slots__ = ("bank", "method", "log_posterior", "administered", "responses", "theta", "se")
+
+    def __init__(self, bank, method="eap", start_theta=0.0):
+        self.bank = bank
+        self.method = method
+        self.log_posterior = bank.log_prior.copy()
+        self.administered = []
+        self.responses = []
+        self.theta = start_theta
+        self.se = None
+
+    # Unadministered item with maximum Fisher information at the current
+    # estimate, optionally restricted by `allowed(position)`
+    def select_next(self, allowed=None):
+        used = set(self.administered)
+        for position in self.bank.order[self.bank.nearest_grid_point(self.theta)]:
+            position = int(position)
+            if position not in used and (allowed is None or allowed(position)):
+                return position
+        return None
+
+    def record(self, position, correct):
+        self.administered.append(position)
+        self.responses.append(bool(correct))
+        column = self.bank.log_p[:, position] if correct else self.bank.log_q[:, position]
+        self.log_posterior += column
+        self._update_estimate()
+
+    def _update_estimate(self):
+        grid = self.bank.theta_grid
+        weights = np.exp(self.log_posterior - self.log_posterior.max())
+        weights /= weights.sum()
+        eap = float(weights @ grid)
+        self.se = float(np.sqrt(weights @ (grid - eap) ** 2))
+        if self.method == "mle" and 0 < sum(self.responses) < len(self.responses):
+            # Likelihood maximum on the grid; undefined for all-correct/all-wrong
+            # patterns, which keep the EAP estimate
+            self.theta = float(grid[np.argmax(self.log_posterior - self.bank.log_prior)])
+        else:
+            self.theta = eap
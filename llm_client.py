@@ -0,0 +1,176 @@
+import random
+import threading
+import time
+from collections import Counter
+
+# Process-wide wrapper around the OpenAI-compatible client. Every completion
+# goes through an optional token-bucket rate limiter, retries transient failures
+# (429, 5xx, timeouts, dropped connections) with jittered exponential backoff
+# that honours Retry-After, and trips a circuit breaker after repeated failures
+# so callers can switch to cached or curated questions instead of waiting.
+# openai itself is imported on first use so loading this module stays cheap.
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    # Take one token, sleeping until one is available; returns the time waited
+    def acquire(self):
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class CircuitBreaker:
+    # Opens after `threshold` consecutive failures and rejects calls for
+    # `cooldown` seconds, then lets a single trial call through (half-open)
+    def __init__(self, threshold=5, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self._opened_at is not None and time.monotonic() - self._opened_at < self.cooldown
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    # Returns True when this failure opened (or re-opened) the circuit
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+
+def retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+
+def is_retryable(error):
+    from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+    if isinstance(error, (APIConnectionError, APITimeoutError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+# Full-jitter exponential backoff, never shorter than the server's Retry-After
+def backoff_delay(attempt, base=0.5, cap=20.0, retry_after=None, rng=random):
+    delay = rng.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+
+class ResilientClient:
+    # rate is requests per second with bursts of up to `burst`; 0 sends requests
+    # as they come and leaves throttling to the endpoint's 429s and Retry-After
+    def __init__(self, api_key, base_url, rate=0.0, burst=5, max_retries=4,
+                 breaker_threshold=5, breaker_cooldown=30.0, timeout=60.0, sleep=time.sleep):
+        from openai import OpenAI
+
+        # Retries are handled here, so the SDK's own retry loop is switched off
+        self._client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0, timeout=timeout)
+        self.bucket = TokenBucket(rate, burst) if rate > 0 else None
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self.max_retries = max_retries
+        self._sleep = sleep
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        # Set by callers once the endpoint has refused response_format, so later
+        # requests go out without it instead of paying for a rejected call each
+        self.response_format_rejected = False
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts)
+
+    @property
+    def circuit_open(self):
+        return self.breaker.is_open
+
+    def chat_completion(self, **kwargs):
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self._count("circuit_rejected")
+                raise CircuitOpenError("LLM endpoint is failing; circuit breaker is open")
+            waited = self.bucket.acquire() if self.bucket is not None else 0.0
+            if waited:
+                self._count("rate_limited")
+            self._count("requests")
+            try:
+                response = self._client.chat.completions.create(**kwargs)
+            except Exception as e:
+                if getattr(e, "status_code", None) == 429:
+                    self._count("throttled")
+                if not is_retryable(e):
+                    # The endpoint answered; the request itself was bad
+                    self.breaker.record_success()
+                    self._count("errors")
+                    raise
+                if self.breaker.record_failure():
+                    self._count("circuit_opened")
+                if attempt >= self.max_retries or self.breaker.is_open:
+                    self._count("errors")
+                    raise
+                self._count("retries")
+                self._sleep(backoff_delay(attempt, retry_after=retry_after_seconds(e)))
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return response
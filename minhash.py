@@ -0,0 +1,140 @@
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from question_banks import question_id
+
+# Lexical near-duplicate filter that needs no model weights: character-shingle
+# MinHash signatures with LSH banding. Signatures live in one growable uint32
+# matrix and each band maps the bytes of its slice to the rows sharing it, so a
+# candidate check hashes the text, looks up `bands` buckets and compares at
+# most `max_bucket` signatures per band, whatever the size of the index.
+# Same interface as question_dedup.NearDuplicateIndex.
+
+PRIME = (1 << 31) - 1
+DEFAULT_THRESHOLD = 0.75
+
+
+# Character shingles of the text with case, punctuation and spacing normalised
+def shingles(text, size=5):
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    text = re.sub(r"\s+", " ", text).strip()
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+# Band count for num_perm permutations: the one whose S-curve midpoint
+# (1/b)^(1/r) is highest without exceeding the threshold, so pairs at the
+# threshold are found with high probability and only confirmed ones rejected
+def choose_bands(num_perm, threshold):
+    midpoints = {b: (1.0 / b) ** (b / num_perm) for b in range(1, num_perm + 1) if num_perm % b == 0}
+    below = [b for b, midpoint in midpoints.items() if midpoint <= threshold]
+    if not below:
+        return max(midpoints)
+    return max(below, key=midpoints.get)
+
+
+class MinHashIndex:
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=128, shingle_size=5, max_bucket=32, seed=1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.max_bucket = max_bucket
+        self.bands = choose_bands(num_perm, threshold)
+        self.rows = num_perm // self.bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, PRIME, size=num_perm, dtype=np.uint64)
+        self._signatures = np.empty((256, num_perm), dtype=np.uint32)
+        self._buckets = [{} for _ in range(self.bands)]
+        self.ids = []
+        self._known = {}
+        self._lock = threading.Lock()
+        self.available = True
+
+    def __len__(self):
+        return len(self.ids)
+
+    def signature(self, text):
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) & PRIME for s in shingles(text, self.shingle_size)), dtype=np.uint64
+        )
+        # (a * x + b) mod p with x, a, b < 2^31 fits in uint64
+        return ((np.outer(hashes, self._a) + self._b) % PRIME).min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    # Rows sharing at least one band with `signature`, at most max_bucket per band
+    def _candidates(self, keys):
+        rows = set()
+        for bucket, key in zip(self._buckets, keys):
+            rows.update(bucket.get(key, ())[:self.max_bucket])
+        return rows
+
+    def _nearest(self, signature, keys, own_id):
+        rows = [r for r in self._candidates(keys) if self.ids[r] != own_id]
+        if not rows:
+            return None
+        similarity = (self._signatures[rows] == signature).mean(axis=1)
+        best = int(np.argmax(similarity))
+        return self.ids[rows[best]], float(similarity[best])
+
+    # Most similar indexed question other than `text` itself: (id, estimated
+    # Jaccard similarity) or None when no band matches
+    def nearest(self, text):
+        signature = self.signature(text)
+        with self._lock:
+            return self._nearest(signature, self._band_keys(signature), question_id(text))
+
+    # Caller must hold self._lock
+    def _store(self, item_id, signature, keys):
+        row = len(self.ids)
+        if row == len(self._signatures):
+            grown = np.empty((2 * row, self.num_perm), dtype=np.uint32)
+            grown[:row] = self._signatures
+            self._signatures = grown
+        self._signatures[row] = signature
+        self.ids.append(item_id)
+        self._known[item_id] = row
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, []).append(row)
+
+    def add(self, texts):
+        added = 0
+        for text in texts:
+            item_id = question_id(text)
+            if item_id in self._known:
+                continue
+            signature = self.signature(text)
+            with self._lock:
+                if item_id not in self._known:
+                    self._store(item_id, signature, self._band_keys(signature))
+                    added += 1
+        return added
+
+    # Check a candidate and index it when it is new: False for an exact repeat
+    # of an indexed text or a near duplicate of one
+    def admit(self, text):
+        item_id = question_id(text)
+        if item_id in self._known:
+            return False
+        signature = self.signature(text)
+        keys = self._band_keys(signature)
+        with self._lock:
+            if item_id in self._known:
+                return False
+            match = self._nearest(signature, keys, None)
+            if match is not None and match[1] >= self.threshold:
+                return False
+            self._store(item_id, signature, keys)
+        return True
+
+
+# Keep the first of every group of near-duplicate texts; returns kept indexes
+def dedupe(texts, threshold=DEFAULT_THRESHOLD, **kwargs):
+    index = MinHashIndex(threshold, **kwargs)
+    return [i for i, text in enumerate(texts) if index.admit(text)]
@@ -0,0 +1,61 @@
+# Question-generation prompts shared by the app and the offline bank builder:
+# ten prompt templates per difficulty and the system instructions that ask for
+# the JSON question format parse_structured_question expects.
+
+# Define unique prompt templates for each difficulty level
+
+easy_prompts = [
+    "Generate an easy GMAT-style quantitative question that involves subtracting two large numbers (e.g., a six-digit number minus a two-digit number). Include five answer choices labeled A–E.",
+    "Create an easy quantitative problem where the question asks for the sum of a sequence of consecutive integers (for example, summing all numbers from 51 to 100). Provide five multiple-choice options.",
+    "Write a GMAT-style question on percent calculations where the problem involves finding the percent increase or decrease of a single value.",
+    "Design an easy quantitative question that asks for the average of a small set of numbers. Ensure the question has five multiple-choice options in a GMAT style.",
+    "Generate a straightforward GMAT quantitative problem involving a basic ratio or proportion between two numbers. Include five answer choices labeled A–E.",
+    "Create an easy question that requires calculating speed, distance, or time with simple numerical values. Format the answer as five multiple-choice options.",
+    "Write an easy GMAT quantitative problem on a work-rate scenario involving a single worker completing a task. Provide five multiple-choice answer options.",
+    "Design an easy quantitative question that asks for the calculation of simple interest given principal, rate, and time. Include five answer choices labeled A–E.",
+    "Generate a basic GMAT-style problem where the candidate solves a single-step linear equation. Format the question with five multiple-choice options.",
+    "Create an easy probability question (e.g., finding the probability of a simple event with equally likely outcomes). Present five answer options in GMAT format."
+]
+
+medium_prompts = [
+    "Generate a medium-difficulty GMAT quantitative problem that involves properties of factorials and divisibility by certain factors. Provide five multiple-choice answer options.",
+    "Design a medium-level question requiring a two-step percent change calculation (e.g., an item’s price increases then decreases). Include five answer choices labeled A–E.",
+    "Write a GMAT-style quantitative problem on profit and loss where two transactions or conditions must be considered. Provide five multiple-choice options.",
+    "Create a medium-difficulty problem that involves mixing two solutions or ingredients and determining the final concentration. Include five answer choices.",
+    "Develop a medium-level GMAT question on sequences defined by a simple recurrence relation (for example, each term is a linear function of the previous term). Format with five answer options.",
+    "Write a quantitative question in the GMAT style where two or three workers with different rates complete a job. Include five multiple-choice answer options.",
+    "Generate a medium-difficulty problem on ratio and proportion that involves combining two or more ratios to find an unknown quantity. Present five answer choices.",
+    "Create a medium-level GMAT Data Sufficiency question that asks whether a given algebraic statement is sufficient to determine an unknown value. Provide two statements and five answer options.",
+    "Develop a GMAT-style probability problem that requires using combinations to determine the probability of a specific event. Format the question with five answer choices.",
+    "Design a medium-difficulty quantitative problem that combines percentage calculations with an average (arithmetic mean) computation. Provide five answer choices."
+]
+
+hard_prompts = [
+    "Generate a challenging GMAT-style quantitative question involving factorials and the determination of the highest power of a prime factor in n!. Include five multiple-choice answer options.",
+    "Create a hard GMAT question that requires multi-step reasoning in a profit and loss scenario with varying markups and discounts. Provide five answer choices.",
+    "Design a difficult quantitative problem where a mixture’s concentration changes over time due to evaporation. The question should include several calculation steps and five answer choices.",
+    "Write a hard GMAT-style question on sequences where the recurrence relation is non-linear or requires additional insight to find a specific term. Format the question with five answer options.",
+    "Generate a challenging GMAT quantitative problem involving work and time where multiple workers with different efficiencies complete overlapping tasks. Include five answer choices labeled A–E.",
+    "Develop a hard GMAT Data Sufficiency question that involves two or more interrelated algebraic expressions. Provide two statements and five answer options.",
+    "Create a challenging GMAT probability problem that requires calculating conditional probabilities for multiple interdependent events. Format the question with five answer options.",
+    "Design a hard GMAT-style question in coordinate geometry that involves solving a system of equations to determine a geometric property (e.g., the distance between two points). Include five answer choices.",
+    "Generate a challenging quantitative problem where the candidate must work with functions and their inverses, including composite function operations. Present five answer choices.",
+    "Write a hard GMAT quantitative question that involves complex ratios and proportions with fractional relationships, requiring multiple steps to solve. Provide five answer choices labeled A–E."
+]
+
+# Explicit structured instructions and an example, sent as the system prompt
+STRUCTURED_INSTRUCTION = (
+    "\n\nIMPORTANT: Your entire output MUST be a valid JSON object with exactly these keys: "
+    "'question', 'choices', and 'correct_answer'. No additional text should be output. "
+    "The 'choices' value must be an array of 5 strings, each starting with 'A.', 'B.', 'C.', 'D.', and 'E.' respectively. "
+    "Example: {\"question\": \"What is 2+2?\", \"choices\": [\"A. 3\", \"B. 4\", \"C. 5\", \"D. 6\", \"E. 7\"], \"correct_answer\": \"B\"}"
+)
+
+BATCH_INSTRUCTION = (
+    "\n\nIMPORTANT: You will receive {count} numbered question requests. Your entire output MUST be a valid JSON "
+    "object with a single key 'questions' whose value is an array of exactly {count} question objects, one per "
+    "request and in the same order. No additional text should be output. Each question object must have exactly "
+    "the keys 'question', 'choices', and 'correct_answer'. The 'choices' value must be an array of 5 strings, each "
+    "starting with 'A.', 'B.', 'C.', 'D.', and 'E.' respectively. "
+    "Example: {{\"questions\": [{{\"question\": \"What is 2+2?\", \"choices\": [\"A. 3\", \"B. 4\", \"C. 5\", \"D. 6\", \"E. 7\"], \"correct_answer\": \"B\"}}]}}"
+)
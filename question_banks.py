@@ -0,0 +1,269 @@
+import hashlib
+import random
+import threading
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from types import MappingProxyType
+
+DIFFICULTIES = ["easy", "medium", "hard"]
+DIFFICULTY_CODES = {d: code for code, d in enumerate(DIFFICULTIES)}
+
+# Every bank hands questions to the test through the same three calls:
+#   remaining(difficulty) -> how many questions can still be taken
+#   take(difficulty)      -> next question at that difficulty; take(difficulty,
+#                            on_progress) also reports a question that is still
+#                            being generated, see GenerationProgress
+#   prefetch(difficulty)  -> hint that the test is now at this difficulty
+#   shutdown()            -> release background workers once a test is over; the
+#                            bank stays usable and starts them again on demand
+
+
+def question_id(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+# Latest partial question published by a streaming fetch, read by whoever is
+# waiting on it. The version only changes when the partial question does.
+class GenerationProgress:
+    __slots__ = ("_version", "_partial")
+
+    def __init__(self):
+        self._version = 0
+        self._partial = None
+
+    def update(self, partial):
+        self._partial = partial
+        self._version += 1
+
+    def snapshot(self):
+        return self._version, self._partial
+
+
+# Read-only question record. Pool records are shared by every session of the
+# process, so they are frozen instead of copied.
+def freeze_question(question, difficulty):
+    return MappingProxyType({
+        **question,
+        "id": question_id(question["question"]),
+        "difficulty": difficulty,
+        "choices": tuple(question["choices"]),
+    })
+
+
+# Process-wide, append-only set of frozen questions per difficulty. Sessions
+# never mutate it; they read it through a PooledQuestionBank cursor.
+class QuestionPool:
+    def __init__(self):
+        self._questions = {d: [] for d in DIFFICULTIES}
+        self._texts = {d: set() for d in DIFFICULTIES}
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self.ready = False
+
+    # Fill the pool from builder() once, even when several sessions ask at the same time
+    def ensure_built(self, builder):
+        if self.ready:
+            return
+        with self._build_lock:
+            if not self.ready:
+                self.extend(builder())
+
+    # Placeholder stand-ins (marked "placeholder") are never shared
+    def add(self, difficulty, question):
+        if question.get("placeholder"):
+            return False
+        with self._lock:
+            if question["question"] in self._texts[difficulty]:
+                return False
+            self._texts[difficulty].add(question["question"])
+            self._questions[difficulty].append(freeze_question(question, difficulty))
+            return True
+
+    # The pool only counts as built once a bank arrives without placeholders;
+    # until then the next session builds again and adds what is still missing
+    def extend(self, question_bank):
+        complete = True
+        for difficulty in DIFFICULTIES:
+            for question in question_bank.get(difficulty, []):
+                if question.get("placeholder"):
+                    complete = False
+                else:
+                    self.add(difficulty, question)
+        self.ready = complete
+
+    def count(self, difficulty):
+        return len(self._questions[difficulty])
+
+    def size(self):
+        return sum(len(questions) for questions in self._questions.values())
+
+    def get(self, difficulty, position):
+        return self._questions[difficulty][position]
+
+    # Every question in the pool, easy to hard
+    def questions(self):
+        return tuple(q for d in DIFFICULTIES for q in self._questions[d])
+
+    # IRT item table over questions(), in the same order; params maps question
+    # id -> calibrated (a, b, c)
+    def item_bank(self, params=None):
+        from irt_engine import ItemBank
+
+        return ItemBank.from_questions(self.questions(), params)
+
+
+# Per-session cursor into a shared pool: the pool size when the session started,
+# a random start offset and a served count per difficulty, so a session costs a few hundred bytes however large the
+# pool is, and every session walks the pool in its own order. `fallback_factory`
+# builds a second bank (e.g. a LazyQuestionBank) the first time a difficulty runs out.
+class PooledQuestionBank:
+    __slots__ = ("_pool", "_count", "_offset", "_served", "_fallback", "_fallback_factory")
+
+    def __init__(self, pool, fallback_factory=None, rng=random):
+        self._pool = pool
+        # Counts are fixed when the session starts, so questions other sessions
+        # add to the pool later neither shift this session's positions nor let
+        # it serve a question twice
+        self._count = array("I", (pool.count(d) for d in DIFFICULTIES))
+        self._offset = array("I", (rng.randrange(count) if count else 0 for count in self._count))
+        self._served = array("I", (0 for _ in DIFFICULTIES))
+        self._fallback = None
+        self._fallback_factory = fallback_factory
+
+    @property
+    def pool(self):
+        return self._pool
+
+    def _pool_remaining(self, code):
+        return max(self._count[code] - self._served[code], 0)
+
+    def _get_fallback(self):
+        if self._fallback is None and self._fallback_factory is not None:
+            self._fallback = self._fallback_factory()
+        return self._fallback
+
+    def remaining(self, difficulty):
+        remaining = self._pool_remaining(DIFFICULTY_CODES[difficulty])
+        if self._fallback_factory is not None:
+            # An untouched fallback is assumed to hold at least one question
+            remaining += self._fallback.remaining(difficulty) if self._fallback is not None else 1
+        return remaining
+
+    def take(self, difficulty, on_progress=None):
+        code = DIFFICULTY_CODES[difficulty]
+        if self._pool_remaining(code) > 0:
+            position = (self._offset[code] + self._served[code]) % self._count[code]
+            self._served[code] += 1
+            return self._pool.get(difficulty, position)
+        fallback = self._get_fallback()
+        if fallback is not None:
+            return fallback.take(difficulty, on_progress)
+        return None
+
+    def shutdown(self):
+        if self._fallback is not None:
+            self._fallback.shutdown()
+
+    def prefetch(self, difficulty):
+        # Only warm the fallback for difficulties whose pooled questions are used up
+        if self._fallback_factory is None:
+            return
+        for other in DIFFICULTIES:
+            if self._pool_remaining(DIFFICULTY_CODES[other]) == 0:
+                self._get_fallback().warm(other)
+
+
+# Bank that generates questions on demand. Taking the first question costs a
+# single model call; afterwards prefetch() asks `transition` where the test can
+# go next (correct and incorrect answer) and generates those candidates in the
+# background while the user is reading the current question.
+class LazyQuestionBank:
+    def __init__(self, fetch, prompt_dict, transition, placeholder, per_difficulty=10, max_workers=4, streaming=False,
+                 thread_initializer=None):
+        # fetch(prompt, exclude) returns a question whose text is not in exclude;
+        # with streaming=True it is called as fetch(prompt, exclude, progress) and
+        # publishes partial questions to the GenerationProgress while it runs.
+        # thread_initializer runs once in every worker thread, as for ThreadPoolExecutor.
+        self._fetch = fetch
+        self._streaming = streaming
+        self._prompts = {d: list(prompt_dict[d][:per_difficulty]) for d in DIFFICULTIES}
+        self._transition = transition
+        self._placeholder = placeholder
+        self._next_prompt = {d: 0 for d in DIFFICULTIES}
+        self._pending = {d: deque() for d in DIFFICULTIES}
+        self._seen = {d: set() for d in DIFFICULTIES}
+        self._lock = threading.Lock()
+        self._max_workers = max_workers
+        self._thread_initializer = thread_initializer
+        self._executor = None
+
+    def remaining(self, difficulty):
+        with self._lock:
+            unstarted = len(self._prompts[difficulty]) - self._next_prompt[difficulty]
+            return unstarted + len(self._pending[difficulty])
+
+    # Start generating the next prompt at `difficulty` unless one is already queued
+    def warm(self, difficulty):
+        with self._lock:
+            if not self._pending[difficulty]:
+                self._schedule(difficulty)
+
+    def prefetch(self, difficulty):
+        for was_correct in (True, False):
+            next_difficulty, _ = self._transition(was_correct, difficulty, 0)
+            self.warm(next_difficulty)
+
+    # on_progress(partial) is called from the caller's thread with each new
+    # partial question while the one being taken is still streaming in
+    def take(self, difficulty, on_progress=None):
+        with self._lock:
+            if not self._pending[difficulty]:
+                self._schedule(difficulty)
+            if not self._pending[difficulty]:
+                return None
+            prompt, future, progress = self._pending[difficulty].popleft()
+        if on_progress is not None and progress is not None:
+            shown = 0
+            while not future.done():
+                version, partial = progress.snapshot()
+                if version != shown:
+                    on_progress(partial)
+                    shown = version
+                wait([future], timeout=0.05)
+        question = future.result()
+        retry_count = 0
+        while question['question'] in self._seen[difficulty] and retry_count < 3:
+            question = self._fetch(prompt, frozenset(self._seen[difficulty]))
+            retry_count += 1
+        if question['question'] in self._seen[difficulty]:
+            question = self._placeholder(difficulty, len(self._seen[difficulty]) + 1)
+        with self._lock:
+            self._seen[difficulty].add(question['question'])
+        return question
+
+    # Queued fetches still finish so their questions can be taken; the workers
+    # exit once idle and the next _schedule starts a new executor
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    # Caller must hold self._lock
+    def _schedule(self, difficulty):
+        index = self._next_prompt[difficulty]
+        if index >= len(self._prompts[difficulty]):
+            return
+        self._next_prompt[difficulty] += 1
+        prompt = self._prompts[difficulty][index]
+        seen = frozenset(self._seen[difficulty])
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers, initializer=self._thread_initializer)
+        if self._streaming:
+            progress = GenerationProgress()
+            future = self._executor.submit(self._fetch, prompt, seen, progress)
+        else:
+            progress = None
+            future = self._executor.submit(self._fetch, prompt, seen)
+        self._pending[difficulty].append((prompt, future, progress))
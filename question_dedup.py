@@ -0,0 +1,144 @@
+import threading
+
+from question_banks import question_id
+
+# Near-duplicate detection for generated questions. Every accepted question is
+# embedded once with sentence-transformers and persisted in a chromadb
+# collection, so embeddings survive restarts. Lookups do not go through chroma:
+# its embeddings are loaded once into an in-process VectorIndex (IVF over
+# k-means cells), and a candidate is checked against everything generated or
+# cached so far with one approximate nearest-neighbour query that stays well
+# under a millisecond at 100k questions. Both libraries are optional: they are
+# imported on first use, and when they or the model cannot be loaded nothing is
+# reported as a duplicate.
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+DEFAULT_THRESHOLD = 0.92
+COLLECTION_NAME = "questions"
+
+
+class NearDuplicateIndex:
+    # threshold is the cosine similarity at or above which a question counts as
+    # a paraphrase of one already indexed. encoder(texts) -> unit vectors and
+    # collection (chromadb-like add/get) can be passed in; otherwise they are
+    # created from model_name and path on first use.
+    def __init__(self, path, model_name=DEFAULT_MODEL, threshold=DEFAULT_THRESHOLD, encoder=None, collection=None):
+        self.path = path
+        self.model_name = model_name
+        self.threshold = threshold
+        self._encoder = encoder
+        self._collection = collection
+        self._vectors = None
+        self._known = set()
+        self._load_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._loaded = False
+        self.available = True
+
+    # Import the libraries and restore the persisted index; False when unavailable.
+    # A missing library is not the only way this fails: the model download can
+    # raise OSError or a hub HTTP error offline, and chromadb can fail to open
+    # the store, so any error here disables the index instead of the session.
+    def load(self):
+        if self._loaded:
+            return self.available
+        with self._load_lock:
+            if self._loaded:
+                return self.available
+            try:
+                if self._encoder is None:
+                    from sentence_transformers import SentenceTransformer
+
+                    model = SentenceTransformer(self.model_name)
+                    self._encoder = lambda texts: model.encode(list(texts), normalize_embeddings=True)
+                if self._collection is None:
+                    import chromadb
+
+                    client = chromadb.PersistentClient(path=self.path)
+                    self._collection = client.get_or_create_collection(
+                        COLLECTION_NAME, metadata={"hnsw:space": "cosine"}
+                    )
+                from vector_index import VectorIndex
+
+                self._vectors = self._restore(VectorIndex)
+            except Exception:
+                self._known.clear()
+                self.available = False
+                self._loaded = True
+                return False
+            self._loaded = True
+            return True
+
+    # Rebuild the in-memory index from the persisted embeddings, page by page
+    def _restore(self, index_class, page=5000):
+        index = None
+        offset = 0
+        while True:
+            rows = self._collection.get(include=["embeddings"], limit=page, offset=offset)
+            if not len(rows["ids"]):
+                break
+            if index is None:
+                index = index_class(len(rows["embeddings"][0]))
+            index.add(rows["ids"], rows["embeddings"])
+            self._known.update(rows["ids"])
+            offset += len(rows["ids"])
+        return index
+
+    def __len__(self):
+        return len(self._known) if self.load() else 0
+
+    # Most similar indexed question other than `text` itself: (id, similarity) or None
+    def nearest(self, text, embedding=None):
+        if not self.load() or self._vectors is None:
+            return None
+        if embedding is None:
+            embedding = self._encoder([text])[0]
+        own_id = question_id(text)
+        for match_id, similarity in self._vectors.search(embedding, k=2):
+            if match_id != own_id:
+                return match_id, similarity
+        return None
+
+    # Caller must hold self._write_lock
+    def _store(self, ids, embeddings):
+        from vector_index import VectorIndex
+
+        if self._vectors is None:
+            self._vectors = VectorIndex(len(embeddings[0]))
+        self._collection.add(ids=ids, embeddings=[list(map(float, e)) for e in embeddings])
+        self._vectors.add(ids, embeddings)
+        self._known.update(ids)
+
+    # Index questions whose text is not indexed yet, `batch_size` at a time;
+    # returns how many were added
+    def add(self, texts, batch_size=1000):
+        if not self.load():
+            return 0
+        by_id = {question_id(text): text for text in texts}
+        new_ids = [i for i in by_id if i not in self._known]
+        for start in range(0, len(new_ids), batch_size):
+            batch = new_ids[start:start + batch_size]
+            embeddings = self._encoder([by_id[i] for i in batch])
+            with self._write_lock:
+                self._store(batch, embeddings)
+        return len(new_ids)
+
+    # Check a candidate and index it when it is new: False for an exact repeat
+    # of an indexed text or a near duplicate of one
+    def admit(self, text):
+        if not self.load():
+            return True
+        own_id = question_id(text)
+        # nearest() skips the text's own entry, so an exact repeat is caught here
+        if own_id in self._known:
+            return False
+        embedding = self._encoder([text])[0]
+        # Serialised so two workers cannot both admit paraphrases of each other
+        with self._write_lock:
+            if own_id in self._known:
+                return False
+            match = self.nearest(text, embedding)
+            if match is not None and match[1] >= self.threshold:
+                return False
+            self._store([own_id], [embedding])
+        return True
@@ -0,0 +1,354 @@
+import json
+import re
+import threading
+from collections import Counter
+
+# Parsing and validation of model completions into question dicts. The JSON
+# object is located in one left-to-right scan that skips any prose or ``` fences
+# around it and drops trailing commas; failures raise a QuestionParseError
+# subclass so callers can tell a missing object from a schema problem.
+
+ANSWER_LETTERS = "ABCDE"
+
+# JSON schema sent as the OpenAI-compatible `response_format` so the endpoint
+# constrains decoding to a valid question object
+QUESTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "question": {"type": "string"},
+        "choices": {"type": "array", "items": {"type": "string"}, "minItems": 5, "maxItems": 5},
+        "correct_answer": {"type": "string", "enum": list(ANSWER_LETTERS)},
+    },
+    "required": ["question", "choices", "correct_answer"],
+    "additionalProperties": False,
+}
+
+
+# Several questions per completion, returned in prompt order
+QUESTION_BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {"questions": {"type": "array", "items": QUESTION_SCHEMA}},
+    "required": ["questions"],
+    "additionalProperties": False,
+}
+
+
+def response_format(mode, batch=False):
+    if mode == "json_schema":
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "gmat_question_batch" if batch else "gmat_question",
+                "schema": QUESTION_BATCH_SCHEMA if batch else QUESTION_SCHEMA,
+                "strict": True,
+            },
+        }
+    if mode == "json_object":
+        return {"type": "json_object"}
+    return None
+
+
+# Process-wide counts of how completions were parsed: "structured" (the body was
+# the JSON object itself), "text_fallback" (the object had to be dug out of
+# surrounding text), "failed", and "format_rejected" (endpoint refused response_format)
+class ParseStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def record(self, outcome):
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def fallback_rate(self):
+        with self._lock:
+            parsed = self._counts["structured"] + self._counts["text_fallback"]
+            return self._counts["text_fallback"] / parsed if parsed else 0.0
+
+
+parse_stats = ParseStats()
+
+
+class QuestionParseError(ValueError):
+    pass
+
+
+class NoJSONObjectError(QuestionParseError):
+    pass
+
+
+class MalformedJSONError(QuestionParseError):
+    pass
+
+
+class SchemaError(QuestionParseError):
+    pass
+
+
+# Where a JSON value can open: an object starts with a key or closes at once, so
+# prose braces like "{x}" are skipped without being scanned; an array may hold anything
+OPENER_PATTERNS = {"{": r'\{(?=\s*["}])', "[": r"\["}
+_opener_regexes = {}
+
+
+def _next_opener(text, openers, position):
+    regex = _opener_regexes.get(openers)
+    if regex is None:
+        regex = _opener_regexes[openers] = re.compile("|".join(OPENER_PATTERNS[o] for o in openers))
+    # str.find jumps over brace-free prose faster than the regex can
+    starts = [i for i in (text.find(opener, position) for opener in openers) if i >= 0]
+    match = regex.search(text, min(starts)) if starts else None
+    return match.start() if match else -1
+
+
+# Return the first balanced {...} object in `text` that decodes as JSON, with
+# trailing commas removed. A balanced span that does not decode (braces in the
+# prose, e.g. "the set {1, 2, 3}") is skipped and the scan resumes after it, so
+# the text is still walked once. Pass openers="{[" to also accept a top-level array.
+def extract_json_object(text, openers="{"):
+    return _decode_json_object(text, openers)[1]
+
+
+# extract_json_object that also returns the decoded value: (value, span)
+def _decode_json_object(text, openers):
+    if not isinstance(text, str):
+        raise NoJSONObjectError(f"Expected completion text, got {type(text).__name__}")
+    start = _next_opener(text, openers, 0)
+    if start < 0:
+        raise NoJSONObjectError("No JSON object found in completion")
+    while True:
+        candidate, end = _balanced_span(text, start)
+        try:
+            return json.loads(candidate), candidate
+        except (json.JSONDecodeError, RecursionError):
+            start = _next_opener(text, openers, end)
+            if start < 0:
+                raise MalformedJSONError("No valid JSON object found in completion")
+
+
+# The balanced span opening at text[start] with trailing commas removed, and the
+# index just past it
+def _balanced_span(text, start):
+    out = []
+    depth = 0
+    in_string = False
+    escaped = False
+    pending_comma = None
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch in " \t\r\n":
+            out.append(ch)
+            continue
+        if ch in "}]":
+            if pending_comma is not None:
+                out[pending_comma] = ""
+            pending_comma = None
+            out.append(ch)
+            depth -= 1
+            if depth == 0:
+                return "".join(out), i + 1
+            continue
+        if ch == ",":
+            pending_comma = len(out)
+        else:
+            pending_comma = None
+            if ch in "{[":
+                depth += 1
+            elif ch == '"':
+                in_string = True
+        out.append(ch)
+    raise MalformedJSONError("Unterminated JSON object in completion")
+
+
+# Validate and normalise a decoded question: exactly five "A."-"E." choices
+# (short lists are padded) and a single-letter correct_answer
+def validate_question(data):
+    if not isinstance(data, dict):
+        raise SchemaError("Question must be a JSON object")
+    missing = [k for k in ['question', 'choices', 'correct_answer'] if k not in data]
+    if missing:
+        raise SchemaError(f"Question is missing keys: {', '.join(missing)}")
+    question = data['question']
+    if not isinstance(question, str) or not question.strip():
+        raise SchemaError("'question' must be a non-empty string")
+    choices = data['choices']
+    if not isinstance(choices, list) or not choices or not all(isinstance(c, str) for c in choices):
+        raise SchemaError("'choices' must be a non-empty list of strings")
+    choices = choices[:5]
+    if len(choices) < 5:
+        choices = choices + [f"{chr(65+i)}. Option {i+1}" for i in range(len(choices), 5)]
+    answer = data['correct_answer']
+    if not isinstance(answer, str):
+        raise SchemaError("'correct_answer' must be a string")
+    answer = answer.strip().lstrip("(").upper()[:1]
+    if not answer or answer not in ANSWER_LETTERS:
+        raise SchemaError(f"'correct_answer' must be one of A-E, got {data['correct_answer']!r}")
+    return {**data, 'question': question.strip(), 'choices': choices, 'correct_answer': answer}
+
+
+def parse_question(text):
+    data, _ = _decode_json_object(text, "{")
+    return validate_question(data)
+
+
+# Parse a completion requested with response_format: decode the body directly and
+# only fall back to scanning the text when the endpoint ignored the format
+def parse_structured_question(text, stats=parse_stats):
+    try:
+        data = json.loads(text)
+    except (TypeError, json.JSONDecodeError):
+        data = None
+    try:
+        if isinstance(data, dict):
+            question = validate_question(data)
+            stats.record("structured")
+            return question
+        question = parse_question(text)
+        stats.record("text_fallback")
+        return question
+    except QuestionParseError:
+        stats.record("failed")
+        raise
+
+
+# Parse a completion holding several questions, either {"questions": [...]} or a
+# bare array. Returns one entry per expected question: the validated question, or
+# None when that item is missing or invalid so only it needs to be re-requested.
+def parse_question_batch(text, expected, stats=parse_stats):
+    try:
+        data = json.loads(text)
+        outcome = "structured"
+    except (TypeError, json.JSONDecodeError):
+        try:
+            data, _ = _decode_json_object(text, "{[")
+        except QuestionParseError:
+            for _ in range(expected):
+                stats.record("failed")
+            raise MalformedJSONError("No JSON question batch found in completion")
+        outcome = "text_fallback"
+    items = data.get("questions") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        items = []
+    results = []
+    for i in range(expected):
+        try:
+            if i >= len(items):
+                raise SchemaError(f"Batch is missing question {i + 1}")
+            results.append(validate_question(items[i]))
+            stats.record(outcome)
+        except QuestionParseError:
+            results.append(None)
+            stats.record("failed")
+    return results
+
+
+JSON_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+# Incremental view of a question object that is still streaming in. feed() the
+# completion text as it arrives; `question` holds the stem decoded so far and
+# `choices` only the entries whose string has closed. Prose or ``` fences before
+# the object are skipped. The finished `text` still goes through
+# parse_structured_question for validation.
+class StreamingQuestionParser:
+    def __init__(self):
+        self._parts = []
+        self.question = ""
+        self.choices = []
+        self.done = False
+        self._depth = 0
+        self._key = None
+        self._expect_key = False
+        self._in_string = False
+        self._escape = None
+        self._string = []
+        self._role = None
+
+    @property
+    def text(self):
+        return "".join(self._parts)
+
+    def snapshot(self):
+        return {"question": self.question, "choices": list(self.choices)}
+
+    # Consume a chunk; True when the visible question or choices changed
+    def feed(self, chunk):
+        self._parts.append(chunk)
+        before = (len(self.question), len(self.choices))
+        for ch in chunk:
+            if self.done:
+                break
+            if self._in_string:
+                self._string_char(ch)
+            else:
+                self._structure_char(ch)
+        if self._in_string and self._role == "question":
+            self.question = "".join(self._string)
+        return (len(self.question), len(self.choices)) != before
+
+    def _string_char(self, ch):
+        if self._escape is not None:
+            if self._escape == "" and ch == "u":
+                self._escape = "u"
+            elif self._escape.startswith("u"):
+                self._escape += ch
+                if len(self._escape) == 5:
+                    try:
+                        self._string.append(chr(int(self._escape[1:], 16)))
+                    except ValueError:
+                        pass
+                    self._escape = None
+            else:
+                self._string.append(JSON_ESCAPES.get(ch, ch))
+                self._escape = None
+        elif ch == "\\":
+            self._escape = ""
+        elif ch == '"':
+            self._in_string = False
+            self._close_string("".join(self._string))
+        else:
+            self._string.append(ch)
+
+    def _close_string(self, value):
+        if self._role == "key":
+            self._key = value
+        elif self._role == "question":
+            self.question = value
+        elif self._role == "choice":
+            self.choices.append(value)
+
+    def _structure_char(self, ch):
+        if self._depth == 0:
+            if ch == "{":
+                self._depth = 1
+                self._expect_key = True
+            return
+        if ch == '"':
+            self._in_string = True
+            self._string = []
+            if self._depth == 1:
+                self._role = "key" if self._expect_key else "question" if self._key == "question" else None
+            else:
+                self._role = "choice" if self._depth == 2 and self._key == "choices" else None
+        elif ch in "{[":
+            self._depth += 1
+        elif ch in "}]":
+            self._depth -= 1
+            self.done = self._depth == 0
+        elif self._depth == 1 and ch == ":":
+            self._expect_key = False
+        elif self._depth == 1 and ch == ",":
+            self._expect_key = True
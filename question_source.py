@@ -0,0 +1,77 @@
+import json
+from functools import lru_cache
+from itertools import zip_longest
+
+from binary_bank import MappedQuestionIndex, is_binary_bank
+from question_banks import DIFFICULTIES, QuestionPool
+
+# Curated questions from trials/gmat_question_bank.json, loaded once per process,
+# with near-duplicate texts dropped (MinHash, see minhash.py), and indexed by
+# (difficulty, section, template). Sessions read the index through
+# a PooledQuestionBank cursor, so serving a question is an O(1) lookup with no
+# model call. A bank converted with binary_bank.py is memory-mapped instead.
+
+# Estimated Jaccard similarity of character shingles above which a curated
+# question is dropped as a near duplicate of an earlier one (0 keeps all)
+DEDUPE_THRESHOLD = 0.75
+
+
+def convert_question(section, item):
+    options = item["options"]
+    return {
+        "question": item["question_text"],
+        "choices": [f"{letter}. {options[letter]}" for letter in sorted(options)],
+        "correct_answer": item["correct_answer"].strip()[:1].upper(),
+        "difficulty": item["difficulty"].strip().lower(),
+        "section": section,
+        "template": item["template"],
+    }
+
+
+class QuestionIndex(QuestionPool):
+    def __init__(self, questions):
+        super().__init__()
+        buckets = {}
+        for question in questions:
+            key = (question["difficulty"], question["section"], question["template"])
+            buckets.setdefault(key, []).append(question)
+        # Per-difficulty serving order interleaves the (section, template) buckets
+        # so consecutive questions at one difficulty come from different topics
+        frozen = {key: [] for key in buckets}
+        for difficulty in DIFFICULTIES:
+            keys = [key for key in buckets if key[0] == difficulty]
+            for row in zip_longest(*(buckets[key] for key in keys)):
+                for key, question in zip(keys, row):
+                    if question is not None and self.add(difficulty, question):
+                        frozen[key].append(self._questions[difficulty][-1])
+        self.buckets = {key: tuple(questions) for key, questions in frozen.items()}
+        self.ready = True
+
+    def lookup(self, difficulty, section=None, template=None):
+        if section is not None and template is not None:
+            return list(self.buckets.get((difficulty, section, template), ()))
+        return [
+            q for q in self._questions[difficulty]
+            if section in (None, q["section"]) and template in (None, q["template"])
+        ]
+
+
+@lru_cache(maxsize=None)
+def load_question_index(path, dedupe_threshold=DEDUPE_THRESHOLD):
+    from minhash import dedupe
+
+    # Already deduplicated and ordered when it was converted
+    if is_binary_bank(path):
+        return MappedQuestionIndex(path)
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    questions = [
+        convert_question(section["section"], item)
+        for section in data["sections"]
+        for item in section["questions"]
+        if item["difficulty"].strip().lower() in DIFFICULTIES
+    ]
+    if dedupe_threshold:
+        questions = [questions[i] for i in dedupe([q["question"] for q in questions], dedupe_threshold)]
+    return QuestionIndex(questions)
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+import time
+
+# Persistent store of validated questions, keyed by a hash of the prompt text and
+# the model that produced them. Each prompt keeps a bounded pool of questions so a
+# warm server can assemble a full bank without calling the model.
+
+DEFAULT_POOL_SIZE = 5
+
+
+def prompt_key(prompt, model):
+    return hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def is_valid_question(question):
+    if not isinstance(question, dict):
+        return False
+    if not all(k in question for k in ['question', 'choices', 'correct_answer']):
+        return False
+    if not isinstance(question['question'], str) or not question['question'].strip():
+        return False
+    if not isinstance(question['choices'], list) or len(question['choices']) != 5:
+        return False
+    return question['correct_answer'] in ['A', 'B', 'C', 'D', 'E']
+
+
+class QuestionStore:
+    # pool_size caps how many questions are kept per prompt (oldest are evicted
+    # first); max_age, in seconds, expires questions regardless of pool size.
+    def __init__(self, path, pool_size=DEFAULT_POOL_SIZE, max_age=None):
+        self.path = path
+        self.pool_size = pool_size
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS questions ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " prompt_key TEXT NOT NULL,"
+                " question TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " UNIQUE (prompt_key, question))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_questions_prompt ON questions (prompt_key, created_at)"
+            )
+
+    def _expire(self, key):
+        if self.max_age is not None:
+            self._conn.execute(
+                "DELETE FROM questions WHERE prompt_key = ? AND created_at < ?",
+                (key, time.time() - self.max_age)
+            )
+
+    def count(self, prompt, model):
+        key = prompt_key(prompt, model)
+        with self._lock, self._conn:
+            self._expire(key)
+            row = self._conn.execute("SELECT COUNT(*) FROM questions WHERE prompt_key = ?", (key,)).fetchone()
+        return row[0]
+
+    def is_full(self, prompt, model):
+        return self.count(prompt, model) >= self.pool_size
+
+    # Random stored question for the prompt whose text is not in `exclude`
+    def sample(self, prompt, model, exclude=()):
+        key = prompt_key(prompt, model)
+        with self._lock, self._conn:
+            self._expire(key)
+            rows = self._conn.execute(
+                "SELECT question, payload FROM questions WHERE prompt_key = ?", (key,)
+            ).fetchall()
+        candidates = [payload for text, payload in rows if text not in exclude]
+        if not candidates:
+            return None
+        return json.loads(random.choice(candidates))
+
+    def add(self, prompt, model, question):
+        if not is_valid_question(question):
+            return False
+        key = prompt_key(prompt, model)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO questions (prompt_key, question, payload, created_at) VALUES (?, ?, ?, ?)",
+                (key, question['question'], json.dumps(question), time.time())
+            )
+            self._conn.execute(
+                "DELETE FROM questions WHERE prompt_key = ? AND id NOT IN ("
+                " SELECT id FROM questions WHERE prompt_key = ? ORDER BY created_at DESC, id DESC LIMIT ?)",
+                (key, key, self.pool_size)
+            )
+        return cursor.rowcount > 0
+
+    # Text of every stored question, in insertion order
+    def texts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT question FROM questions ORDER BY id").fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,55 @@
+# Scoring and skill assessment for a single finished test. Kept free of
+# Streamlit so the rules can be reused by batch scoring and simulations.
+
+def calculate_adaptive_score(difficulty_history, answers):
+    difficulty_points = {'easy': 1, 'medium': 2, 'hard': 3}
+    raw_score = sum(difficulty_points[diff] for i, diff in enumerate(difficulty_history) if answers[i])
+    max_score = sum(difficulty_points[diff] for diff in difficulty_history)
+    percentage = (raw_score / max_score) * 100 if max_score > 0 else 0
+    weighted_score = 0
+    total_weight = 0
+    for i, diff in enumerate(difficulty_history):
+        weight = (i + 1) / len(difficulty_history)
+        total_weight += weight
+        if answers[i]:
+            weighted_score += difficulty_points[diff] * weight
+    normalized_weighted_score = (weighted_score / total_weight) * len(difficulty_history) if total_weight > 0 else 0
+    return {
+        'raw_score': raw_score,
+        'max_score': max_score,
+        'percentage': percentage,
+        'weighted_score': round(normalized_weighted_score, 1)
+    }
+
+def calculate_difficulty_stats(difficulty_history, answers):
+    difficulty_stats = {}
+    for diff in ["easy", "medium", "hard"]:
+        questions = [i for i, d in enumerate(difficulty_history) if d == diff]
+        if questions:
+            correct = sum(answers[i] for i in questions)
+            total = len(questions)
+            difficulty_stats[diff] = {
+                "correct": correct,
+                "total": total,
+                "percentage": round((correct / total) * 100, 1) if total > 0 else 0
+            }
+    return difficulty_stats
+
+def assess_skill(score_data, difficulty_stats):
+    if score_data['percentage'] >= 80:
+        if difficulty_stats.get('hard', {}).get('percentage', 0) >= 70:
+            assessment = "Advanced"
+            description = "You have mastered most GMAT quantitative concepts."
+        elif difficulty_stats.get('medium', {}).get('percentage', 0) >= 70:
+            assessment = "Proficient"
+            description = "You have solid understanding of most GMAT quantitative concepts."
+        else:
+            assessment = "Intermediate"
+            description = "You have good grasp of basic concepts but should work on harder problems."
+    elif score_data['percentage'] >= 60:
+        assessment = "Developing"
+        description = "You understand foundational concepts but need more practice with medium and hard problems."
+    else:
+        assessment = "Foundational"
+        description = "Focus on strengthening your understanding of basic GMAT quantitative concepts."
+    return assessment, description
@@ -0,0 +1,186 @@
+from question_banks import DIFFICULTIES, DIFFICULTY_CODES
+
+# Headless adaptive-test engine. TestSession owns every state transition of a
+# test: start, submit, drawing the next question (falling back to another
+# difficulty when one runs out) and the end after `length` questions. The
+# Streamlit view, the load test and offline policy simulation all drive the same
+# code. State is compact: difficulty codes in a bytearray and answers as the bits
+# of an int, so a session without a bank costs a few hundred bytes and a 10-question
+# simulated test takes a few microseconds.
+
+TEST_LENGTH = 10
+
+
+# Updated update_difficulty function based on the new rules:
+def update_difficulty(was_correct, current_difficulty, streak):
+    # New adaptive rules:
+    # - If correct:
+    #     - easy  → medium
+    #     - medium → hard
+    #     - hard   → hard (remains unchanged)
+    # - If wrong:
+    #     - easy   → easy (remains unchanged)
+    #     - medium → easy
+    #     - hard   → medium
+    if was_correct:
+        if current_difficulty == "easy":
+            new_difficulty = "medium"
+        elif current_difficulty == "medium":
+            new_difficulty = "hard"
+        else:  # current_difficulty == "hard"
+            new_difficulty = "hard"
+    else:
+        if current_difficulty == "easy":
+            new_difficulty = "easy"
+        elif current_difficulty == "medium":
+            new_difficulty = "easy"
+        else:  # current_difficulty == "hard"
+            new_difficulty = "medium"
+
+    new_streak = 0
+    return new_difficulty, new_streak
+
+
+# A memoryless transition (like update_difficulty, whose streak is always 0) as
+# a lookup table: table[code + 3 * was_correct] is the next difficulty code
+def policy_table(transition):
+    return bytes(
+        DIFFICULTY_CODES[transition(was_correct, difficulty, 0)[0]]
+        for was_correct in (False, True) for difficulty in DIFFICULTIES
+    )
+
+
+DEFAULT_POLICY = policy_table(update_difficulty)
+
+
+class TestSession:
+    __slots__ = ("length", "number", "answered", "pending", "_policy", "_bank", "_codes", "_answers",
+                 "_questions", "_irt", "_irt_questions", "_item")
+
+    # bank: any question bank (remaining/take/prefetch), or None to simulate
+    # difficulties only. With an IRTSession and its questions in item order, IRT
+    # picks every question instead of the policy.
+    def __init__(self, bank=None, policy=DEFAULT_POLICY, length=TEST_LENGTH, irt=None, irt_questions=None):
+        self.length = length
+        # Question being shown, 1-based; 0 before start(), length + 1 once finished
+        self.number = 0
+        self.answered = 0
+        # Difficulty code picked by submit() that advance() has not drawn yet
+        self.pending = None
+        self._policy = policy
+        self._bank = bank
+        self._codes = bytearray()
+        self._answers = 0
+        self._questions = []
+        self._irt = irt
+        self._irt_questions = irt_questions
+        self._item = None
+
+    @property
+    def started(self):
+        return self.number > 0
+
+    @property
+    def finished(self):
+        return self.number > self.length
+
+    @property
+    def irt(self):
+        return self._irt
+
+    @property
+    def pending_difficulty(self):
+        return DIFFICULTIES[self.pending] if self.pending is not None else None
+
+    @property
+    def question(self):
+        return self._questions[-1] if self._questions else None
+
+    @property
+    def difficulty(self):
+        return DIFFICULTIES[self._codes[-1]] if self._codes else None
+
+    def difficulty_history(self):
+        return tuple(DIFFICULTIES[code] for code in self._codes)
+
+    def answers(self):
+        return tuple(bool(self._answers >> i & 1) for i in range(self.answered))
+
+    def correct_count(self):
+        return bin(self._answers).count("1")
+
+    # Show the first question; False when the bank has nothing to give
+    def start(self, difficulty, on_progress=None):
+        if self._irt is not None:
+            item = self._irt.select_next()
+            if item is None:
+                return False
+            self._show_item(item)
+        elif self._bank is not None:
+            if self._draw(DIFFICULTY_CODES[difficulty], on_progress) is None:
+                return False
+        else:
+            self._codes.append(DIFFICULTY_CODES[difficulty])
+        self.number = 1
+        return True
+
+    # Record the answer to the current question and pick the next one. Returns
+    # the next question's difficulty, or None when the test is over (after the
+    # last question, or when IRT has no items left). With a bank and the rule-based
+    # policy the pick is only pending until advance() draws it.
+    def submit(self, was_correct):
+        answered = self.answered
+        if was_correct:
+            self._answers |= 1 << answered
+        self.answered = answered + 1
+        if self._irt is not None:
+            self._irt.record(self._item, was_correct)
+        if self.number >= self.length:
+            self.number += 1
+            return None
+        if self._irt is not None:
+            item = self._irt.select_next()
+            if item is None:
+                self.number = self.length + 1
+                return None
+            code = self._show_item(item)
+        else:
+            code = self._policy[self._codes[answered] + 3 * was_correct]
+            if self._bank is None:
+                self._codes.append(code)
+            else:
+                self.pending = code
+        self.number += 1
+        return DIFFICULTIES[code]
+
+    # Draw the question picked by submit(), at its difficulty or at the first
+    # difficulty that still has questions. Returns the difficulty drawn; None
+    # ends the test because the bank is empty.
+    def advance(self, on_progress=None):
+        code = self.pending
+        if code is None:
+            return self.difficulty
+        self.pending = None
+        drawn = self._draw(code, on_progress)
+        if drawn is None:
+            self.number = self.length + 1
+            return None
+        return DIFFICULTIES[drawn]
+
+    def _draw(self, code, on_progress):
+        for candidate in (code, 0, 1, 2):
+            difficulty = DIFFICULTIES[candidate]
+            if self._bank.remaining(difficulty) > 0:
+                self._questions.append(self._bank.take(difficulty, on_progress))
+                self._codes.append(candidate)
+                self._bank.prefetch(difficulty)
+                return candidate
+        return None
+
+    def _show_item(self, item):
+        self._item = item
+        question = self._irt_questions[item]
+        code = DIFFICULTY_CODES[question["difficulty"]]
+        self._questions.append(question)
+        self._codes.append(code)
+        return code
@@ -0,0 +1,226 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch_scoring import score_attempts
+from irt_engine import DEFAULT_ITEM_PARAMS, probability_correct
+from question_banks import DIFFICULTIES, DIFFICULTY_CODES
+from session_engine import DEFAULT_POLICY, TEST_LENGTH
+
+# Monte Carlo evaluation of the adaptive policy (update_difficulty) and the
+# percentage score and skill bands built on it (scoring.py). Synthetic
+# candidates with a known ability theta ~ N(mean, sd) answer questions under
+# the default IRT item parameters of their difficulty; whole chunks of tests
+# are walked question by question as NumPy arrays, using the same policy table
+# as session_engine.TestSession, and scored with batch_scoring.
+#
+# A finite test is compared with what the same policy would report given
+# unlimited questions: the difficulty mix a candidate settles into is the
+# stationary distribution of the 3-state chain the policy induces from their
+# per-difficulty accuracies, which fixes a long-run percentage and band. Bias,
+# spread and band agreement per ability bin show how well a test separates
+# candidates; --convergence repeats the summary for other test lengths (prefixes
+# of the same simulated tests). Chunks run in a process pool for large sweeps.
+#
+#   python simulate_policy.py --candidates 2000000 --convergence 5,10,20,40
+
+BANDS = ["Foundational", "Developing", "Intermediate", "Proficient", "Advanced"]
+
+POLICY = np.frombuffer(DEFAULT_POLICY, dtype=np.uint8).astype(np.intp)
+POINTS = np.array([1.0, 2.0, 3.0])
+ITEM_A, ITEM_B, ITEM_C = (np.array([DEFAULT_ITEM_PARAMS[d][i] for d in DIFFICULTIES]) for i in range(3))
+
+# Ability bin edges for the report; the outer bins are open-ended
+THETA_BINS = np.arange(-2.5, 2.51, 0.5)
+
+# Per-bin sums accumulated by every chunk, in this order
+BIN_STATS = ["n", "error", "error_sq", "score", "score_sq", "long_run", "agree", "weighted", "weighted_sq"]
+# Sums for the correlation of ability with the percentage and weighted scores
+MOMENTS = ["theta", "theta_sq", "score", "score_sq", "theta_score", "weighted", "weighted_sq", "theta_weighted"]
+
+
+# Band from scoring.assess_skill, for arrays; a difficulty never asked counts as 0%
+def assess_bands(percentage, medium_percentage, hard_percentage):
+    medium = np.nan_to_num(medium_percentage, nan=0.0)
+    hard = np.nan_to_num(hard_percentage, nan=0.0)
+    top = np.where(hard >= 70, 4, np.where(medium >= 70, 3, 2))
+    return np.where(percentage >= 80, top, np.where(percentage >= 60, 1, 0))
+
+
+# (n, 3) probability of answering each difficulty correctly
+def response_probabilities(theta):
+    return probability_correct(theta, ITEM_A, ITEM_B, ITEM_C)
+
+
+# Walk every candidate through `length` questions; returns difficulty codes and answers
+def simulate_tests(p, length, start_code, rng):
+    n = len(p)
+    rows = np.arange(n)
+    codes = np.empty((n, length), dtype=np.int8)
+    correct = np.empty((n, length), dtype=bool)
+    code = np.full(n, start_code, dtype=np.intp)
+    for step in range(length):
+        codes[:, step] = code
+        hit = rng.random(n) < p[rows, code]
+        correct[:, step] = hit
+        code = POLICY[code + 3 * hit]
+    return codes, correct
+
+
+# Stationary difficulty mix of each candidate's policy chain, (n, 3)
+def stationary_mix(p):
+    n = len(p)
+    transition = np.zeros((n, 3, 3))
+    for code in range(3):
+        transition[:, code, POLICY[code]] += 1.0 - p[:, code]
+        transition[:, code, POLICY[code + 3]] += p[:, code]
+    # Solve pi (P - I) = 0 with sum(pi) = 1 replacing the last equation
+    system = np.transpose(transition, (0, 2, 1)) - np.eye(3)
+    system[:, 2, :] = 1.0
+    rhs = np.zeros((n, 3, 1))
+    rhs[:, 2, 0] = 1.0
+    return np.linalg.solve(system, rhs)[:, :, 0]
+
+
+# Long-run percentage score and band of each candidate
+def long_run_assessment(p):
+    mix = stationary_mix(p)
+    percentage = 100.0 * (mix * POINTS * p).sum(axis=1) / (mix * POINTS).sum(axis=1)
+    visited = mix > 1e-9
+    accuracy = np.where(visited, 100.0 * p, np.nan)
+    medium, hard = DIFFICULTY_CODES["medium"], DIFFICULTY_CODES["hard"]
+    return percentage, assess_bands(percentage, accuracy[:, medium], accuracy[:, hard])
+
+
+# Simulate one chunk of candidates and return its sums (added up across chunks)
+def simulate_chunk(seed, size, lengths, start_code, theta_mean, theta_sd):
+    rng = np.random.default_rng(seed)
+    theta = rng.normal(theta_mean, theta_sd, size)
+    p = response_probabilities(theta)
+    codes, correct = simulate_tests(p, max(lengths), start_code, rng)
+    long_run, true_band = long_run_assessment(p)
+    bins = np.digitize(theta, THETA_BINS)
+    nbins = len(THETA_BINS) + 1
+
+    def per_bin(values):
+        return np.bincount(bins, weights=values, minlength=nbins)
+
+    bin_stats = np.empty((len(lengths), len(BIN_STATS), nbins))
+    confusion = np.empty((len(lengths), len(BANDS), len(BANDS)))
+    moments = np.empty((len(lengths), len(MOMENTS)))
+    for i, length in enumerate(lengths):
+        scores = score_attempts(codes[:, :length], correct[:, :length])
+        score = scores["percentage"]
+        weighted = scores["weighted_score"]
+        band = assess_bands(
+            score, scores["per_difficulty"]["medium"]["percentage"], scores["per_difficulty"]["hard"]["percentage"]
+        )
+        error = score - long_run
+        bin_stats[i] = [
+            np.bincount(bins, minlength=nbins), per_bin(error), per_bin(error ** 2), per_bin(score),
+            per_bin(score ** 2), per_bin(long_run), per_bin(band == true_band), per_bin(weighted), per_bin(weighted ** 2),
+        ]
+        confusion[i] = np.bincount(true_band * len(BANDS) + band, minlength=len(BANDS) ** 2).reshape(len(BANDS), -1)
+        moments[i] = [
+            theta.sum(), (theta ** 2).sum(), score.sum(), (score ** 2).sum(), (theta * score).sum(),
+            weighted.sum(), (weighted ** 2).sum(), (theta * weighted).sum(),
+        ]
+    return {"bins": bin_stats, "confusion": confusion, "moments": moments}
+
+
+def run(candidates, lengths, start, theta_mean=0.0, theta_sd=1.0, chunk_size=100_000, workers=1, seed=0):
+    sizes = [min(chunk_size, candidates - start_at) for start_at in range(0, candidates, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(s, size, lengths, DIFFICULTY_CODES[start], theta_mean, theta_sd) for s, size in zip(seeds, sizes)]
+    totals = None
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(simulate_chunk, *zip(*args))
+            for result in results:
+                totals = result if totals is None else {k: totals[k] + v for k, v in result.items()}
+    else:
+        for chunk_args in args:
+            result = simulate_chunk(*chunk_args)
+            totals = result if totals is None else {k: totals[k] + v for k, v in result.items()}
+    return totals
+
+
+def correlation(moments, n, x, y, xy, x_sq, y_sq):
+    m = dict(zip(MOMENTS, moments))
+    cov = m[xy] / n - (m[x] / n) * (m[y] / n)
+    var_x = m[x_sq] / n - (m[x] / n) ** 2
+    var_y = m[y_sq] / n - (m[y] / n) ** 2
+    return cov / np.sqrt(var_x * var_y) if var_x > 0 and var_y > 0 else float("nan")
+
+
+def bin_labels():
+    edges = [f"{edge:+.1f}" for edge in THETA_BINS]
+    return [f"< {edges[0]}"] + [f"{lo}..{hi}" for lo, hi in zip(edges, edges[1:])] + [f">= {edges[-1]}"]
+
+
+def report(totals, lengths):
+    stats = {name: totals["bins"][0, i] for i, name in enumerate(BIN_STATS)}
+    n = stats["n"].sum()
+    moments = totals["moments"][0]
+    print(f"Band agreement with the long-run band: {100 * stats['agree'].sum() / n:.1f}%")
+    print(f"Correlation with ability: percentage "
+          f"{correlation(moments, n, 'theta', 'score', 'theta_score', 'theta_sq', 'score_sq'):.3f}, weighted score "
+          f"{correlation(moments, n, 'theta', 'weighted', 'theta_weighted', 'theta_sq', 'weighted_sq'):.3f}")
+    print()
+    print(f"{'theta':<12} {'n':>9} {'long-run %':>10} {'mean %':>7} {'bias':>6} {'sd':>6} {'rmse':>6} "
+          f"{'agree %':>7} {'weighted':>8} {'w sd':>5}")
+    for label, count, *values in zip(bin_labels(), *(stats[name] for name in BIN_STATS)):
+        if not count:
+            continue
+        s = dict(zip(BIN_STATS[1:], (v / count for v in values)))
+        sd = np.sqrt(max(s["score_sq"] - s["score"] ** 2, 0.0))
+        weighted_sd = np.sqrt(max(s["weighted_sq"] - s["weighted"] ** 2, 0.0))
+        print(f"{label:<12} {int(count):>9} {s['long_run']:>10.1f} {s['score']:>7.1f} {s['error']:>+6.1f} {sd:>6.1f} "
+              f"{np.sqrt(s['error_sq']):>6.1f} {100 * s['agree']:>7.1f} {s['weighted']:>8.2f} {weighted_sd:>5.2f}")
+    print()
+    print("Long-run band (rows) against assigned band (columns), % of row")
+    print(f"{'':<13}" + "".join(f"{band:>13}" for band in BANDS))
+    for band, row in zip(BANDS, totals["confusion"][0]):
+        share = 100 * row / row.sum() if row.sum() else row
+        print(f"{band:<13}" + "".join(f"{value:>13.1f}" for value in share))
+    if len(lengths) > 1:
+        print()
+        print(f"{'length':>6} {'bias':>6} {'rmse':>6} {'agree %':>7} {'corr':>6}")
+        for i in sorted(range(len(lengths)), key=lengths.__getitem__):
+            length = lengths[i]
+            bins = totals["bins"][i]
+            agree = 100 * bins[BIN_STATS.index("agree")].sum() / n
+            bias = bins[BIN_STATS.index("error")].sum() / n
+            rmse = np.sqrt(bins[BIN_STATS.index("error_sq")].sum() / n)
+            corr = correlation(totals["moments"][i], n, "theta", "score", "theta_score", "theta_sq", "score_sq")
+            print(f"{length:>6} {bias:>+6.1f} {rmse:>6.1f} {agree:>7.1f} {corr:>6.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo evaluation of the adaptive difficulty policy")
+    parser.add_argument("--candidates", type=int, default=1_000_000)
+    parser.add_argument("--length", type=int, default=TEST_LENGTH, help="questions per test")
+    parser.add_argument("--convergence", default="", help="comma-separated extra test lengths to summarise")
+    parser.add_argument("--start", choices=DIFFICULTIES, default="medium")
+    parser.add_argument("--theta-mean", type=float, default=0.0)
+    parser.add_argument("--theta-sd", type=float, default=1.0)
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="candidates per worker task")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    lengths = [args.length] + sorted({int(v) for v in args.convergence.split(",") if v.strip()} - {args.length})
+    started = time.perf_counter()
+    totals = run(args.candidates, lengths, args.start, args.theta_mean, args.theta_sd,
+                 args.chunk_size, args.workers, args.seed)
+    elapsed = time.perf_counter() - started
+    print(f"{args.candidates} candidates, {args.length}-question tests from {args.start}, "
+          f"theta ~ N({args.theta_mean:g}, {args.theta_sd:g}^2), {args.workers} workers, {elapsed:.1f}s")
+    report(totals, lengths)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import sys
+import types
+
+import pytest
+
+from minhash import MinHashIndex
+from question_dedup import NearDuplicateIndex
+
+QUESTION = "If 3x + 4 = 19, what is the value of x?"
+
+
+# sentence_transformers stand-in whose model cannot be fetched, as when the
+# hub is unreachable and the weights are not cached
+@pytest.fixture
+def offline_model(monkeypatch):
+    def unavailable(model_name):
+        raise OSError(f"We couldn't connect to the hub to load {model_name}")
+
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = unavailable
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+
+
+def test_load_failure_disables_index(offline_model, tmp_path):
+    index = NearDuplicateIndex(str(tmp_path))
+    assert index.load() is False
+    assert index.available is False
+    assert index.admit(QUESTION) is True
+    assert index.admit(QUESTION) is True
+    assert index.nearest(QUESTION) is None
+    assert len(index) == 0
+
+
+def test_app_falls_back_to_minhash(offline_model, tmp_path, monkeypatch):
+    import app2
+
+    class Store:
+        def texts(self):
+            return [QUESTION]
+
+    monkeypatch.setattr(app2, "DEDUP_MODE", "embedding")
+    monkeypatch.setattr(app2, "DEDUP_INDEX_PATH", str(tmp_path))
+    monkeypatch.setattr(app2, "get_question_store", Store)
+    app2.get_dedup_index.clear()
+    try:
+        index = app2.get_dedup_index()
+    finally:
+        app2.get_dedup_index.clear()
+    assert isinstance(index, MinHashIndex)
+    assert len(index) == 1
+    assert index.admit(QUESTION) is False
@@ -0,0 +1,104 @@
+import numpy as np
+
+# In-memory approximate nearest-neighbour index over unit vectors (cosine
+# similarity = dot product). Small indexes are searched exhaustively; past
+# `train_size` vectors they are partitioned into ~sqrt(n) k-means cells (IVF)
+# and a query only scores the vectors in its `nprobe` closest cells. Cells
+# are retrained when the index has grown 4x since the last training. Each cell
+# keeps a contiguous copy of its vectors, so a query scores a few slices
+# instead of gathering rows from the full matrix.
+
+
+class VectorIndex:
+    def __init__(self, dim, nprobe=8, train_size=4096, seed=0):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.train_size = train_size
+        self._rng = np.random.default_rng(seed)
+        self._vectors = np.empty((1024, dim), dtype=np.float32)
+        self._size = 0
+        self.ids = []
+        self._centroids = None
+        self._trained_at = 0
+        self._members = []
+        self._cells = []
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def vectors(self):
+        return self._vectors[:self._size]
+
+    def add(self, ids, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        needed = self._size + len(vectors)
+        if needed > len(self._vectors):
+            grown = np.empty((max(needed, 2 * len(self._vectors)), self.dim), dtype=np.float32)
+            grown[:self._size] = self.vectors
+            self._vectors = grown
+        start = self._size
+        self._vectors[start:needed] = vectors
+        self._size = needed
+        self.ids.extend(ids)
+        if self._centroids is None:
+            if self._size >= self.train_size:
+                self._train()
+        elif self._size >= 4 * self._trained_at:
+            self._train()
+        else:
+            cells = np.argmax(vectors @ self._centroids.T, axis=1)
+            for row, cell in zip(range(start, needed), cells):
+                self._members[cell].append(row)
+                self._cells[cell] = None
+
+    def _train(self, iterations=8):
+        data = self.vectors
+        k = max(int(np.sqrt(len(data))), 1)
+        sample = data[self._rng.choice(len(data), size=min(len(data), 64 * k), replace=False)]
+        centroids = sample[self._rng.choice(len(sample), size=k, replace=False)].copy()
+        for _ in range(iterations):
+            cells = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, cells, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        cells = np.argmax(data @ centroids.T, axis=1)
+        order = np.argsort(cells, kind="stable")
+        bounds = np.searchsorted(cells[order], np.arange(k + 1))
+        self._members = [order[bounds[c]:bounds[c + 1]].tolist() for c in range(k)]
+        self._cells = [None] * k
+        self._centroids = centroids
+        self._trained_at = len(data)
+
+    # (rows, vectors) of one cell, rebuilt after the cell has grown
+    def _cell(self, cell):
+        if self._cells[cell] is None:
+            rows = np.array(self._members[cell], dtype=np.int64)
+            self._cells[cell] = (rows, self._vectors[rows])
+        return self._cells[cell]
+
+    # Rows of the candidate vectors and their similarity to `query`
+    def _score(self, query):
+        if self._centroids is None:
+            return np.arange(self._size), self.vectors @ query
+        centroid_scores = self._centroids @ query
+        probe = min(self.nprobe, len(centroid_scores))
+        rows, scores = [], []
+        for cell in np.argpartition(-centroid_scores, probe - 1)[:probe]:
+            cell_rows, cell_vectors = self._cell(cell)
+            rows.append(cell_rows)
+            scores.append(cell_vectors @ query)
+        return np.concatenate(rows), np.concatenate(scores)
+
+    # Up to k (id, similarity) pairs, most similar first
+    def search(self, query, k=1):
+        if not self._size:
+            return []
+        rows, scores = self._score(np.asarray(query, dtype=np.float32))
+        k = min(k, len(rows))
+        if not k:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[rows[i]], float(scores[i])) for i in top]